@@ -1,36 +1,44 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Novel, Chapter, Bookmark, UserSettings, Comment, Tag, NovelVote
-from .utils import generate_chapters, get_epub_metadata
+from .models import Novel, Chapter, Bookmark, UserSettings, Comment, Tag, Genre, NovelVote, IngestJob, TrendingRank
+from .utils import enqueue_ingest
 
 # =====================================================
-# 1. TAG ADMIN
+# 1. TAG & GENRE ADMIN
 # =====================================================
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ('name',)
 
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    prepopulated_fields = {'slug': ('name',)}
+    search_fields = ('name',)
+
 # =====================================================
 # 2. NOVEL ADMIN (VERSI RINGAN & CEPAT)
 # =====================================================
 @admin.register(Novel)
 class NovelAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'status', 'view_chapters_link', 'uploaded_at')
+    list_display = ('title', 'author', 'genre', 'status', 'view_chapters_link', 'uploaded_at')
     search_fields = ('title', 'author')
-    list_filter = ('status', 'genre', 'uploaded_at')
-    filter_horizontal = ('tags',)
+    list_filter = ('status', 'genres', 'uploaded_at')
+    filter_horizontal = ('genres', 'tags')
     
     # HAPUS INLINE (BIANG KEROK LEMOT)
     # inlines = [ChapterInline] 
     
     # Kita ganti dengan tombol custom
-    readonly_fields = ('view_chapters_link', 'views', 'rating_score')
+    readonly_fields = (
+        'view_chapters_link', 'views', 'rating_score', 'vote_count', 'vote_sum',
+        'chapter_count', 'latest_chapter_id', 'latest_chapter_index', 'latest_chapter_title',
+    )
 
     # --- FITUR TOMBOL PINTAR ---
     def view_chapters_link(self, obj):
-        count = obj.chapters.count()
+        count = obj.chapter_count
         # Membuat URL ke halaman list chapter, difilter by id novel ini
         url = (
             reverse("admin:library_chapter_changelist")
@@ -46,26 +54,16 @@ class NovelAdmin(admin.ModelAdmin):
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
-        
-        # Proses EPUB
-        if 'epub_file' in form.changed_data and obj.epub_file:
-            try:
-                meta = get_epub_metadata(obj.epub_file.path)
-                updated = False
-                if not obj.title or obj.title in ["New Novel", "."]:
-                    if meta.get('title'): obj.title = meta['title']; updated = True
-                if not obj.author or obj.author == "Unknown":
-                    if meta.get('author'): obj.author = meta['author']; updated = True
-                if not obj.synopsis:
-                    if meta.get('synopsis'): obj.synopsis = meta['synopsis']; updated = True
-                
-                if updated: obj.save()
 
-                obj.chapters.all().delete()
-                generate_chapters(obj)
-                self.message_user(request, f"Sukses ekstrak chapter dari {obj.epub_file.name}", level='SUCCESS')
-            except Exception as e:
-                self.message_user(request, f"Gagal proses EPUB: {e}", level='ERROR')
+        # Proses EPUB di worker (manage.py ingest_worker), bukan di request admin
+        if 'epub_file' in form.changed_data and obj.epub_file:
+            job = enqueue_ingest(obj)
+            url = reverse("admin:library_ingestjob_change", args=[job.pk])
+            self.message_user(
+                request,
+                format_html('EPUB {} masuk antrian ingest (<a href="{}">job #{}</a>)', obj.epub_file.name, url, job.pk),
+                level='SUCCESS'
+            )
 
 # =====================================================
 # 3. CHAPTER ADMIN (TEMPAT EDIT MASAL)
@@ -73,7 +71,7 @@ class NovelAdmin(admin.ModelAdmin):
 @admin.register(Chapter)
 class ChapterAdmin(admin.ModelAdmin):
     # Tampilkan kolom yang penting
-    list_display = ('title', 'novel', 'order', 'chapter_index')
+    list_display = ('id', 'title', 'novel', 'order', 'chapter_index')
     
     # FITUR EDIT DI LIST (EDITABLE LIST)
     # Ini memungkinkan edit judul/urutan LANGSUNG di tabel daftar tanpa masuk detail
@@ -88,7 +86,28 @@ class ChapterAdmin(admin.ModelAdmin):
     ordering = ('novel', 'order')
 
 # =====================================================
-# 4. ADMIN LAINNYA
+# 4. ANTRIAN INGEST
+# =====================================================
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'novel', 'status', 'chapters_created', 'duration_display', 'worker', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('novel__title',)
+    readonly_fields = ('novel', 'status', 'chapters_created', 'error', 'worker', 'created_at', 'started_at', 'finished_at')
+    actions = ['requeue']
+
+    def duration_display(self, obj):
+        seconds = obj.duration()
+        return f"{seconds:.1f}s" if seconds is not None else "-"
+    duration_display.short_description = "Durasi"
+
+    @admin.action(description="Masukkan ulang ke antrian")
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status='running').update(status='pending', started_at=None, finished_at=None, error='', worker='')
+        self.message_user(request, f"{count} job masuk antrian lagi", level='SUCCESS')
+
+# =====================================================
+# 5. ADMIN LAINNYA
 # =====================================================
 @admin.register(Bookmark)
 class BookmarkAdmin(admin.ModelAdmin):
@@ -108,6 +127,12 @@ class CommentAdmin(admin.ModelAdmin):
 class NovelVoteAdmin(admin.ModelAdmin):
     list_display = ('novel', 'user', 'score', 'created_at')
 
+@admin.register(TrendingRank)
+class TrendingRankAdmin(admin.ModelAdmin):
+    # Diisi `manage.py compute_trending`, hanya untuk dilihat
+    list_display = ('rank', 'novel', 'score', 'computed_at')
+    readonly_fields = ('rank', 'novel', 'score', 'computed_at')
+
 @admin.register(UserSettings)
 class UserSettingsAdmin(admin.ModelAdmin):
     list_display = ('user', 'theme')
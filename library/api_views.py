@@ -1,25 +1,65 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+import hashlib
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, F
-from .models import Novel, Chapter, Bookmark, UserSettings, Comment, Tag, NovelVote
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q, Subquery
+from .models import Novel, Chapter, Bookmark, UserSettings, Comment, Tag, NovelVote, IngestJob, genre_slug
 from .serializers import (
     NovelListSerializer, NovelDetailSerializer, ChapterSerializer, 
     UserSerializer, UserSettingsSerializer, CommentSerializer,
-    ChapterDetailSerializer 
+    ChapterDetailSerializer, IngestJobSerializer
 )
+from .autocomplete import suggest
+from .facets import facet_counts
+from .feeds import home_snapshot
+from .navigation import chapter_neighbours, chapter_neighbours_many
+from .pagination import ChapterCursorPagination, NovelCursorPagination
+from .search import search_chapters, search_novels as full_text_search
+from .viewcounts import record_view
+from .blobstore import content_key
+
+# --- CONDITIONAL GET (ETag / Last-Modified) ---
+def make_etag(*parts):
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+
+def has_validators(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+def not_modified(request, etag, last_modified):
+    """HttpResponseNotModified kalau validator klien masih cocok, selain itu None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=quote_etag(etag), last_modified=timestamp)
+
+def chapter_etag(chapter, prev_id, next_id):
+    if not chapter.content_hash:
+        # Baris lama sebelum content_hash ada: hitung sekali lalu simpan
+        chapter.content_hash = content_key(chapter.content)
+        Chapter.objects.filter(pk=chapter.pk).update(content_hash=chapter.content_hash, content_length=len(chapter.content))
+    return make_etag(
+        'chapter', chapter.pk, chapter.content_hash, chapter.title, chapter.order, chapter.chapter_index,
+        prev_id, next_id, chapter.novel.updated_at.isoformat()
+    )
+
+def with_validators(response, etag, last_modified, private=False):
+    response['ETag'] = quote_etag(etag)
+    if last_modified: response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Boleh disimpan klien, tapi selalu divalidasi ulang (murah: 304)
+    response['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return response
 
 # --- HOME DATA ---
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def home_data(request):
-    hot_novels = Novel.objects.order_by('-views')[:6]
-    latest_novels = Novel.objects.order_by('-uploaded_at')[:10]
-    completed_novels = Novel.objects.filter(status='Completed')[:5]
-    
+    # Bagian bersama dari snapshot di cache (library/feeds.py); hanya
+    # `recent` yang dihitung per user
+    snapshot = home_snapshot()
+
     # LOGIC RECENT READS (User Login)
     recent_reads = []
     if request.user.is_authenticated:
@@ -43,91 +83,247 @@ def home_data(request):
             })
 
     return Response({
-        'hot': NovelListSerializer(hot_novels, many=True).data,
-        'latest': NovelListSerializer(latest_novels, many=True).data,
-        'completed': NovelListSerializer(completed_novels, many=True).data,
+        'hot': snapshot['hot'],
+        'latest': snapshot['latest'],
+        'completed': snapshot['completed'],
         'recent': recent_reads
     })
 
 # --- NOVEL & CHAPTER ---
+# Urutan katalog yang didukung cursor pagination (semua punya index di Novel)
+NOVEL_SORTS = {
+    'latest': ('-uploaded_at', '-id'),
+    'updated': ('-updated_at', '-id'),
+    'popular': ('-views', '-id'),
+}
+
+def tag_filter(tag):
+    # EXISTS, bukan join + distinct(): satu baris per novel dan tetap bisa di-cursor
+    return Exists(Novel.tags.through.objects.filter(
+        Q(tag__slug__iexact=tag) | Q(tag__name__iexact=tag), novel_id=OuterRef('pk')
+    ))
+
+def genre_filter(genre):
+    # Nama atau slug ("Sci-Fi" / "sci-fi" / "玄幻") dicocokkan lewat index unik Genre.slug / Genre.name
+    return Exists(Novel.genres.through.objects.filter(
+        Q(genre__slug=genre_slug(genre)) | Q(genre__name=genre), novel_id=OuterRef('pk')
+    ))
+
+def paginate_novels(request, novels, ordering):
+    paginator = NovelCursorPagination(ordering)
+    result_page = paginator.paginate_queryset(novels, request)
+    serializer = NovelListSerializer(result_page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+def search_ordering(novels, sort, default):
+    # Hasil full-text punya anotasi search_rank -> urut relevansi kecuali diminta lain
+    if 'search_rank' in novels.query.annotations and sort in (None, '', 'relevance'):
+        return ('-search_rank', '-id')
+    return NOVEL_SORTS.get(sort, NOVEL_SORTS[default])
+
 @api_view(['GET'])
 def novel_list(request):
     query = request.GET.get('q')
     genre = request.GET.get('genre')
     tag = request.GET.get('tag')
+    sort = request.GET.get('sort')
 
-    novels = Novel.objects.all().order_by('-uploaded_at')
+    novels = Novel.objects.all()
 
     if query:
-        novels = novels.filter(Q(title__icontains=query) | Q(author__icontains=query))
+        # Full-text (library/search.py), urut relevansi
+        novels = full_text_search(novels, query)
     if genre:
-        novels = novels.filter(genre__iexact=genre)
+        novels = novels.filter(genre_filter(genre))
     if tag:
-        novels = novels.filter(tags__slug__iexact=tag) | novels.filter(tags__name__iexact=tag)
-        novels = novels.distinct()
+        novels = novels.filter(tag_filter(tag))
 
-    paginator = PageNumberPagination()
-    paginator.page_size = 12
-    result_page = paginator.paginate_queryset(novels, request)
-    serializer = NovelListSerializer(result_page, many=True)
-    return paginator.get_paginated_response(serializer.data)
+    return paginate_novels(request, novels, search_ordering(novels, sort, 'latest'))
 
 @api_view(['GET'])
 def search_novels(request):
     query = request.query_params.get('q', '')
     genre = request.query_params.get('genre', '')
     status = request.query_params.get('status', '')
-    sort = request.query_params.get('sort', 'latest')
+    sort = request.query_params.get('sort')
 
     # Mulai dengan semua novel
     novels = Novel.objects.all()
 
-    # Filter berdasarkan Keyword (Title/Author)
+    # Filter berdasarkan Keyword (judul, judul alternatif, author, sinopsis)
     if query:
-        novels = novels.filter(
-            Q(title__icontains=query) | Q(author__icontains=query)
-        )
+        novels = full_text_search(novels, query)
 
-    # Filter berdasarkan Genre (Mencari di relasi many-to-many Genre)
+    # Filter berdasarkan Genre
     if genre:
-        novels = novels.filter(genres__name__iexact=genre)
+        novels = novels.filter(genre_filter(genre))
 
     # Filter berdasarkan Status (Ongoing/Completed)
     if status:
         novels = novels.filter(status__iexact=status)
 
-    # Logika Sortir
-    if sort == 'latest':
-        novels = novels.order_by('-updated_at')
-    elif sort == 'popular':
-        # Kamu mungkin butuh field views/bookmark_count untuk ini
-        novels = novels.order_by('-id') 
+    # Sortir: relevance (default kalau ada q) / latest (di sini = baru diupdate) / popular
+    if sort == 'latest': sort = 'updated'
+    return paginate_novels(request, novels, search_ordering(novels, sort, 'updated'))
 
-    serializer = NovelSerializer(novels, many=True)
-    return Response(serializer.data)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def novel_autocomplete(request):
+    """
+    Saran judul saat mengetik (toleran typo), dari index trigram di memori.
+    Tanpa autentikasi supaya jalurnya tidak menyentuh database sama sekali.
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 8)), 20))
+    except ValueError:
+        limit = 8
+    return Response({'q': query, 'results': suggest(query, limit) if len(query) >= 2 else []})
+
+@api_view(['GET'])
+def novel_text_search(request, novel_id):
+    """
+    Cari kata/nama di isi chapter satu novel. Hasil urut relevansi, dengan
+    snippet (<mark> di kata yang cocok) dan posisi karakter di teks chapter.
+    """
+    novel = get_object_or_404(Novel.objects.only('id'), pk=novel_id)
+    query = request.query_params.get('q', '').strip()
+    page_size = 20
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    count, results = search_chapters(novel.pk, query, limit=page_size, offset=(page - 1) * page_size)
+    return Response({
+        'q': query,
+        'count': count,
+        'page': page,
+        'has_next': page * page_size < count,
+        'results': results,
+    })
 
 @api_view(['GET'])
 def novel_detail(request, pk):
-    Novel.objects.filter(pk=pk).update(views=F('views') + 1)
     novel = get_object_or_404(Novel, pk=pk)
-    serializer = NovelDetailSerializer(novel, context={'request': request}) 
-    return Response(serializer.data)
+
+    # Versi = updated_at (naik saat novel/chapter/tag/genre berubah) + status bookmark user.
+    # Status bookmark tidak ikut updated_at, jadi user login hanya divalidasi lewat ETag
+    # (tanpa Last-Modified, supaya If-Modified-Since tidak memberi 304 dengan flag basi)
+    bookmarked = request.user.is_authenticated and Bookmark.objects.filter(
+        user=request.user, novel=novel, is_in_library=True
+    ).exists()
+    etag = make_etag('novel', novel.pk, novel.updated_at.isoformat(), bookmarked)
+    last_modified = None if request.user.is_authenticated else novel.updated_at
+    cached = not_modified(request, etag, last_modified)
+    if cached: return cached
+
+    # Revalidasi 304 bukan view baru. Ditulis ke DB per batch oleh buffer, bukan UPDATE per request
+    record_view(novel.pk)
+    serializer = NovelDetailSerializer(novel, context={'request': request, 'is_bookmarked': bookmarked}) 
+    return with_validators(Response(serializer.data), etag, last_modified, private=True)
+
+@api_view(['GET'])
+def novel_chapters(request, novel_id):
+    """
+    Daftar isi novel, paginasi cursor urut (order, id).
+    `?compact=1` -> array paralel (ids/titles/orders/indexes), jauh lebih kecil
+    dari list dict untuk novel ribuan chapter.
+    """
+    novel = get_object_or_404(Novel.objects.only('id', 'updated_at'), pk=novel_id)
+    compact = request.query_params.get('compact') in ('1', 'true')
+    etag = make_etag('toc', novel.pk, novel.updated_at.isoformat(), request.get_full_path())
+    cached = not_modified(request, etag, novel.updated_at)
+    if cached: return cached
+
+    chapters = Chapter.objects.filter(novel_id=novel.pk).only('id', 'title', 'order', 'chapter_index', 'uploaded_at')
+    paginator = ChapterCursorPagination()
+    page = paginator.paginate_queryset(chapters, request)
+
+    if compact:
+        response = Response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'ids': [c.id for c in page],
+            'titles': [c.title for c in page],
+            'orders': [c.order for c in page],
+            'indexes': [c.chapter_index for c in page],
+        })
+    else:
+        response = paginator.get_paginated_response(ChapterSerializer(page, many=True).data)
+    return with_validators(response, etag, novel.updated_at)
 
 @api_view(['GET'])
 def chapter_detail(request, pk):
-    chapter = get_object_or_404(Chapter, pk=pk)
+    chapters = Chapter.objects.select_related('novel')
+    # Request bervalidator kemungkinan besar berakhir 304: jangan ambil content dulu
+    if has_validators(request): chapters = chapters.defer('content')
+    chapter = get_object_or_404(chapters, pk=pk)
+
+    # Navigasi Next/Prev dari index urutan chapter (cache, tanpa query tambahan)
+    prev_id, next_id = chapter_neighbours(chapter)
+
+    novel = chapter.novel
+    etag = chapter_etag(chapter, prev_id, next_id)
+    cached = not_modified(request, etag, novel.updated_at)
+    if cached: return cached
+
     serializer = ChapterDetailSerializer(chapter)
     data = serializer.data
     
-    # Navigasi Next/Prev manual (menggunakan order)
-    next_chap = Chapter.objects.filter(novel=chapter.novel, order__gt=chapter.order).order_by('order').first()
-    prev_chap = Chapter.objects.filter(novel=chapter.novel, order__lt=chapter.order).order_by('-order').first()
+    data['next_chapter_id'] = next_id
+    data['prev_chapter_id'] = prev_id
+    data['novel_id'] = chapter.novel_id
     
-    data['next_chapter_id'] = next_chap.id if next_chap else None
-    data['prev_chapter_id'] = prev_chap.id if prev_chap else None
-    data['novel_id'] = chapter.novel.id 
-    
-    return Response(data)
+    return with_validators(Response(data), etag, novel.updated_at)
+
+@api_view(['GET'])
+def chapter_bundle(request, pk):
+    """
+    Chapter `pk` + `ahead` chapter berikutnya (urutan baca) dalam satu respons,
+    untuk prefetch / baca offline. Satu query range di (novel, order).
+    """
+    try:
+        ahead = int(request.query_params.get('ahead', settings.CHAPTER_BUNDLE_DEFAULT))
+    except ValueError:
+        return Response({'detail': 'ahead harus angka.'}, status=status.HTTP_400_BAD_REQUEST)
+    ahead = max(0, min(ahead, settings.CHAPTER_BUNDLE_MAX))
+
+    # Novel & order chapter awal diambil lewat subquery, jadi tetap satu query
+    start = Chapter.objects.filter(pk=pk)
+    start_order = Subquery(start.values('order')[:1])
+    chapters = Chapter.objects.select_related('novel').filter(
+        novel_id=Subquery(start.values('novel_id')[:1])
+    ).filter(
+        Q(order__gt=start_order) | Q(order=start_order, id__gte=pk)
+    ).order_by('order', 'id')
+    if has_validators(request): chapters = chapters.defer('content')
+    chapters = list(chapters[:ahead + 1])
+    if not chapters or chapters[0].pk != pk:
+        return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    novel = chapters[0].novel
+    neighbours = chapter_neighbours_many(chapters)
+    etags = [chapter_etag(chap, *nav) for chap, nav in zip(chapters, neighbours)]
+    etag = make_etag('bundle', *etags)
+    cached = not_modified(request, etag, novel.updated_at)
+    if cached: return cached
+
+    items = []
+    for chap, (prev_id, next_id), chap_etag in zip(chapters, neighbours, etags):
+        data = ChapterDetailSerializer(chap).data
+        data['prev_chapter_id'] = prev_id
+        data['next_chapter_id'] = next_id
+        data['etag'] = quote_etag(chap_etag)
+        items.append(data)
+
+    return with_validators(Response({
+        'novel_id': novel.id,
+        'chapters': items,
+        # Titik lanjut prefetch berikutnya
+        'next_bundle_chapter_id': neighbours[-1][1],
+    }), etag, novel.updated_at)
 
 # --- USER FEATURE ---
 @api_view(['POST'])
@@ -221,33 +417,41 @@ def rate_novel(request, pk):
     if not score or not (1 <= int(score) <= 5):
         return Response({'message': 'Score must be 1-5'}, status=400)
 
-    NovelVote.objects.update_or_create(novel=novel, user=request.user, defaults={'score': score})
+    NovelVote.objects.update_or_create(novel=novel, user=request.user, defaults={'score': int(score)})
     
-    # Recalculate rating manually (simple avg)
-    votes = NovelVote.objects.filter(novel=novel)
-    total = sum(v.score for v in votes)
-    count = votes.count()
-    novel.rating_score = round(total / count, 1) if count > 0 else 0
-    novel.save()
+    # rating_score dihitung ulang oleh signal vote (library/counters.py)
+    novel.refresh_from_db(fields=['rating_score', 'vote_count'])
     
-    return Response({'status': 'success', 'new_rating': novel.rating_score})
+    return Response({'status': 'success', 'new_rating': novel.rating_score, 'vote_count': novel.vote_count})
 
 # --- TAGS & GENRES ---
 @api_view(['GET'])
 def novels_by_tag(request, tag_slug):
     tag = get_object_or_404(Tag, slug=tag_slug)
     novels = Novel.objects.filter(tags=tag)
-    paginator = PageNumberPagination()
-    paginator.page_size = 12
-    result_page = paginator.paginate_queryset(novels, request)
-    serializer = NovelListSerializer(result_page, many=True)
-    return paginator.get_paginated_response(serializer.data)
+    sort = request.query_params.get('sort')
+    return paginate_novels(request, novels, NOVEL_SORTS.get(sort, NOVEL_SORTS['latest']))
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def genre_list_api(request):
-    genres = Novel.objects.values_list('genre', flat=True).distinct().order_by('genre')
-    return Response(list(genres))
+    # Dari cube facet (library/facets.py), bukan DISTINCT atas tabel novel
+    genres = [g['name'] for g in facet_counts()['genres']]
+    return Response(sorted(genres))
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def facet_browse(request):
+    """
+    Jumlah novel per genre, status dan tag untuk filter yang sedang aktif
+    (?genre=&status=&tag=), satu request untuk seluruh panel filter.
+    """
+    params = request.query_params
+    return Response(facet_counts(
+        genre=params.get('genre') or None,
+        status=params.get('status') or None,
+        tag=params.get('tag') or None,
+    ))
 
 # --- LIBRARY & HISTORY (FIXED) ---
 
@@ -263,18 +467,12 @@ def get_bookmarks(request):
         chap_num = getattr(b.last_read_chapter, 'order', 0) if b.last_read_chapter else 0
         chap_idx = getattr(b.last_read_chapter, 'chapter_index', 0) if b.last_read_chapter else 0
 
-        latest_chap = b.novel.chapters.order_by('-order').first()
-        
+        # Chapter terbaru dari kolom denormalisasi (library/counters.py), bukan query per bookmark
         latest_data = {
-            'id': None,
-            'index': 0,
-            'title': ''
+            'id': b.novel.latest_chapter_id,
+            'index': b.novel.latest_chapter_index if b.novel.latest_chapter_id else 0,
+            'title': b.novel.latest_chapter_title,
         }
-        
-        if latest_chap:
-            latest_data['id'] = latest_chap.id
-            latest_data['index'] = latest_chap.chapter_index
-            latest_data['title'] = latest_chap.title
         data.append({
             "id": b.novel.id,
             "title": b.novel.title,
@@ -315,4 +513,20 @@ def get_history(request):
             "is_in_library": h.is_in_library
         })
         
-    return Response(data)
\ No newline at end of file
+    return Response(data)
+
+# --- ANTRIAN INGEST (ADMIN) ---
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def ingest_job_detail(request, pk):
+    job = get_object_or_404(IngestJob.objects.select_related('novel'), pk=pk)
+    return Response(IngestJobSerializer(job).data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def novel_ingest_status(request, novel_id):
+    # Job terbaru milik novel (untuk polling setelah upload)
+    job = IngestJob.objects.select_related('novel').filter(novel_id=novel_id).first()
+    if not job:
+        return Response({'detail': 'Belum ada job ingest.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(IngestJobSerializer(job).data)
@@ -0,0 +1,179 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+
+from .counters import novels_version
+from .models import Novel
+
+# =====================================================
+# INDEX TRIGRAM AUTOCOMPLETE (IN-PROCESS)
+# =====================================================
+# Inverted index trigram -> {novel_id} atas title, alternative_title dan
+# author, disimpan di memori tiap proses. Teks dinormalisasi dulu (huruf
+# kecil, tanpa diakritik) sehingga "Kimetsu" cocok dengan "kimetsu", "Pokémon"
+# dengan "pokemon", dan salah ketik satu huruf masih menyisakan sebagian besar
+# trigram. Dibangun dari DB saat pertama dipakai; setelah itu diperbarui
+# lewat signal Novel di proses yang sama. Perubahan dari proses lain (worker
+# gunicorn lain, ingest_worker, admin) tidak lewat cache (LocMem per proses):
+# tiap AUTOCOMPLETE_REFRESH_INTERVAL detik versi data dicek dari DB (jumlah
+# novel + updated_at terbaru, lewat index). Kalau berubah, hanya baris yang
+# updated_at-nya >= versi lama yang di-index ulang (vote, ingest chapter dan
+# flush views juga menaikkan updated_at, jadi rebuild penuh terlalu mahal);
+# daftar id hanya dicocokkan ulang kalau jumlahnya tidak sama (ada yang
+# dihapus). Di antara pengecekan, jalur query tidak menyentuh database.
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+def min_score():
+    return getattr(settings, 'AUTOCOMPLETE_MIN_SCORE', 0.45)
+
+
+def refresh_interval():
+    return getattr(settings, 'AUTOCOMPLETE_REFRESH_INTERVAL', 30)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(_WORD.findall(text.lower()))
+
+
+def trigrams(text):
+    """Trigram gaya pg_trgm: tiap kata diberi padding '  kata '."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = defaultdict(set)
+        self.entries = {}  # id -> (title, author, jumlah trigram, judul ternormalisasi, trigram)
+        self.version = None
+        self.checked_at = None
+
+    def add(self, novel_id, title, alternative_title, author):
+        grams = trigrams(title) | trigrams(alternative_title) | trigrams(author)
+        with self.lock:
+            self._remove(novel_id)
+            for gram in grams:
+                self.postings[gram].add(novel_id)
+            self.entries[novel_id] = (title, author, len(grams), normalize(title), grams)
+
+    def remove(self, novel_id):
+        with self.lock:
+            self._remove(novel_id)
+
+    def _remove(self, novel_id):
+        entry = self.entries.pop(novel_id, None)
+        if entry is None: return
+        for gram in entry[4]:
+            ids = self.postings.get(gram)
+            if ids is None: continue
+            ids.discard(novel_id)
+            if not ids: del self.postings[gram]
+
+    def load(self, rows, version):
+        fresh = TrigramIndex()
+        for row in rows:
+            fresh.add(*row)
+        with self.lock:
+            self.postings, self.entries, self.version = fresh.postings, fresh.entries, version
+
+    def ids(self):
+        with self.lock:
+            return set(self.entries)
+
+    def suggest(self, query, limit=8):
+        """[(skor, id, title, author)] urut skor; skor = porsi trigram query yang cocok."""
+        grams = trigrams(query)
+        if not grams: return []
+        prefix = normalize(query)
+        hits = Counter()
+        with self.lock:
+            for gram in grams:
+                # Counter.update di atas iterable dihitung di C (_count_elements)
+                hits.update(self.postings.get(gram, ()))
+            threshold = min_score() * len(grams)
+            # Judul yang diawali ketikan user pasti memuat hampir semua trigram
+            # query, jadi cukup menilai ulang kandidat dengan hit terbanyak
+            candidates = heapq.nlargest(limit * 5, hits.items(), key=itemgetter(1))
+            scored = []
+            for novel_id, count in candidates:
+                if count < threshold: break
+                title, author, size, norm_title, _ = self.entries[novel_id]
+                score = count / len(grams)
+                # Judul yang diawali ketikan user naik, lalu dokumen pendek (lebih spesifik)
+                if norm_title.startswith(prefix): score += 0.5
+                scored.append((score - size * 1e-4, novel_id, title, author))
+        return heapq.nlargest(limit, scored)
+
+
+_index = TrigramIndex()
+
+
+def autocomplete_index():
+    now = time.monotonic()
+    if _index.checked_at is None or now - _index.checked_at >= refresh_interval():
+        # Versi dibaca sebelum baris novel: perubahan di antaranya terlihat di cek berikutnya
+        version = novels_version()
+        if _index.version is None:
+            _index.load(_rows(Novel.objects.all()), version)
+        elif _index.version != version:
+            refresh(version)
+        _index.checked_at = now
+    return _index
+
+
+def _rows(novels):
+    return novels.values_list('id', 'title', 'alternative_title', 'author').iterator()
+
+
+def refresh(version):
+    """Index ulang novel yang berubah sejak versi lama, tanpa membangun ulang semuanya."""
+    count, latest = version
+    since = _index.version[1]
+    changed = Novel.objects.filter(updated_at__gte=since) if since else Novel.objects.all()
+    for row in _rows(changed):
+        _index.add(*row)
+    indexed = _index.ids()
+    if len(indexed) != count:
+        live = set(Novel.objects.values_list('id', flat=True))
+        for novel_id in indexed - live:
+            _index.remove(novel_id)
+        for row in _rows(Novel.objects.filter(id__in=live - indexed)):
+            _index.add(*row)
+    _index.version = version
+
+
+def reset_index():
+    """Paksa cek ulang ke DB di pemakaian berikutnya (mis. antar test)."""
+    _index.version = _index.checked_at = None
+
+
+def suggest(query, limit=8):
+    return [
+        {'id': novel_id, 'title': title, 'author': author, 'score': round(score, 3)}
+        for score, novel_id, title, author in autocomplete_index().suggest(query, limit)
+    ]
+
+
+def novel_indexed(novel):
+    """Dipanggil signal setelah commit; proses lain menyusul lewat novels_version()."""
+    # Index yang belum pernah dibangun akan memuat novel ini dari DB
+    if _index.checked_at is not None:
+        _index.add(novel.pk, novel.title, novel.alternative_title, novel.author)
+
+
+def novel_unindexed(novel_id):
+    _index.remove(novel_id)
@@ -0,0 +1,180 @@
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+from contextlib import contextmanager, redirect_stdout
+from html import escape
+
+from faker import Faker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+    import psutil
+
+# =====================================================
+# BENCHMARK INGEST (DATA SINTETIS)
+# =====================================================
+# Generator EPUB/TXT palsu (Faker) yang meniru isi hasil crawler: halaman
+# cover/judul, daftar isi, nav EPUB3, prologue, lalu chapter dengan link
+# prev/next, div footer, script dan paragraf judul ganda. Dipakai oleh
+# command bench_ingest untuk mengukur tiap tahap ingest secara terpisah.
+
+POOL_SIZE = 300
+
+
+class FakeNovel:
+    """Sumber teks deterministik: `seed` sama -> file sama persis."""
+
+    def __init__(self, seed=1234, locale='en_US'):
+        fake = Faker(locale)
+        fake.seed_instance(seed)
+        self.rng = random.Random(seed)
+        # Faker lambat kalau dipanggil per paragraf; ambil sampel sekali saja
+        self.paragraphs = [fake.paragraph(nb_sentences=8) for _ in range(POOL_SIZE)]
+        self.titles = [fake.catch_phrase() for _ in range(POOL_SIZE)]
+        self.title = fake.sentence(nb_words=4).rstrip('.')
+        self.author = fake.name()
+        self.synopsis = fake.paragraph(nb_sentences=5)
+        self.subjects = ['Fantasy', 'Action', fake.word().title()]
+
+    def chapter_title(self, number):
+        return f"Chapter {number}: {self.rng.choice(self.titles)}"
+
+    def body(self, paragraphs):
+        return [self.rng.choice(self.paragraphs) for _ in range(paragraphs)]
+
+
+def _xhtml(title, body):
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        "<!DOCTYPE html>\n"
+        "<html xmlns=\"http://www.w3.org/1999/xhtml\" xmlns:epub=\"http://www.idpf.org/2007/ops\">"
+        f"<head><title>{escape(title)}</title><link rel=\"stylesheet\" href=\"style.css\"/></head>"
+        f"<body>{body}</body></html>"
+    )
+
+
+def _chapter_xhtml(number, title, paragraphs, total):
+    nav = []
+    if number > 1: nav.append(f'<a href="chap{number - 1:05d}.xhtml">Prev</a>')
+    nav.append('<a href="toc_page.xhtml">Contents</a>')
+    if number < total: nav.append(f'<a href="chap{number + 1:05d}.xhtml">Next</a>')
+    nav = f'<div class="chapter-nav">{" | ".join(nav)}</div>'
+    # Separuh chapter mengulang judul sebagai paragraf (ditangani cleaner)
+    repeat = f"<p>Chapter {number}</p>" if number % 2 else ""
+    text = "".join(f"<p>{escape(p)}</p>" for p in paragraphs)
+    body = (
+        f"{nav}<h1>{escape(title)}</h1>{repeat}{text}"
+        '<div class="footer">Baca di situs aslinya untuk dukung penulis.</div>'
+        f"<script>track({number});</script>{nav}"
+    )
+    return _xhtml(title, body)
+
+
+def build_fake_epub(path, chapters, paragraphs=20, seed=1234):
+    """Tulis EPUB sintetis dengan `chapters` chapter ke `path`. Return jumlah byte."""
+    fake = FakeNovel(seed)
+    docs = []  # (id, href, isi)
+
+    docs.append(('cover', 'cover.xhtml', _xhtml("Cover", '<div><img src="cover.jpg" alt="cover"/></div>')))
+    docs.append(('front', 'front.xhtml', _xhtml(fake.title, f"<h1>{escape(fake.title)}</h1><p>{escape(fake.author)}</p>")))
+    toc_lines = "".join(f"<p>Chapter {i}</p>" for i in range(1, min(chapters, 120) + 1))
+    docs.append(('toc_page', 'toc_page.xhtml', _xhtml("Chapters", f"<h2>Daftar Chapter</h2>{toc_lines}")))
+    prologue = "".join(f"<p>{escape(p)}</p>" for p in fake.body(max(1, paragraphs // 2)))
+    docs.append(('prologue', 'prologue.xhtml', _xhtml("Prologue", f"<h1>Prologue</h1>{prologue}")))
+    for i in range(1, chapters + 1):
+        title = fake.chapter_title(i)
+        docs.append((f"chap{i}", f"chap{i:05d}.xhtml", _chapter_xhtml(i, title, fake.body(paragraphs), chapters)))
+
+    nav_items = "".join(f'<li><a href="{href}">{escape(doc_id)}</a></li>' for doc_id, href, _ in docs)
+    nav = _xhtml("Navigation", f'<nav epub:type="toc"><ol>{nav_items}</ol></nav>')
+
+    manifest = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+    manifest += [f'<item id="{doc_id}" href="{href}" media-type="application/xhtml+xml"/>' for doc_id, href, _ in docs]
+    manifest.append('<item id="css" href="style.css" media-type="text/css"/>')
+    spine = '<itemref idref="nav"/>' + "".join(f'<itemref idref="{doc_id}"/>' for doc_id, _, _ in docs)
+    subjects = "".join(f"<dc:subject>{escape(s)}</dc:subject>" for s in fake.subjects)
+    opf = (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f'<dc:identifier id="id">bench-{seed}-{chapters}</dc:identifier>'
+        f"<dc:title>{escape(fake.title)}</dc:title><dc:creator>{escape(fake.author)}</dc:creator>"
+        f"<dc:description>&lt;p&gt;{escape(fake.synopsis)}&lt;/p&gt;</dc:description>"
+        f"<dc:language>en</dc:language>{subjects}</metadata>"
+        f"<manifest>{''.join(manifest)}</manifest><spine>{spine}</spine></package>"
+    )
+    container = (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+        '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>'
+        "</container>"
+    )
+
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        zf.writestr('META-INF/container.xml', container, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr('OEBPS/content.opf', opf, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr('OEBPS/nav.xhtml', nav, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr('OEBPS/style.css', 'body { margin: 0 }', compress_type=zipfile.ZIP_DEFLATED)
+        for _, href, content in docs:
+            zf.writestr(f'OEBPS/{href}', content, compress_type=zipfile.ZIP_DEFLATED)
+    return os.path.getsize(path)
+
+
+def build_fake_txt(path, chapters, paragraphs=20, seed=1234):
+    """
+    Tulis TXT sintetis: judul & prologue, lalu tiap chapter diawali baris
+    "Chapter N: ..." (cocok untuk mode 'heading' maupun 'chunk').
+    Return jumlah byte.
+    """
+    fake = FakeNovel(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{fake.title}\nby {fake.author}\n\n")
+        for p in fake.body(max(1, paragraphs // 2)):
+            f.write(p + "\n\n")
+        for i in range(1, chapters + 1):
+            f.write(fake.chapter_title(i) + "\n\n")
+            for p in fake.body(paragraphs):
+                f.write(p + "\n\n")
+    return os.path.getsize(path)
+
+
+# =====================================================
+# PENGUKURAN
+# =====================================================
+def peak_rss_kb():
+    """Puncak RSS proses sejauh ini (KB)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak  # macOS: byte
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) // 1024
+
+
+class StageTimer:
+    """Kumpulkan durasi per tahap; satu tahap boleh diukur berkali-kali (diakumulasi)."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.rss_kb = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+            self.rss_kb[name] = peak_rss_kb()
+
+
+@contextmanager
+def quiet():
+    """Bungkam print() dari cleaner/generate_chapters selama pengukuran."""
+    with redirect_stdout(io.StringIO()):
+        yield
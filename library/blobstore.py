@@ -0,0 +1,76 @@
+import hashlib
+import mmap
+import os
+
+import zstandard
+from django.conf import settings
+
+from .compression import compression_level
+
+# =====================================================
+# BLOB STORE CHAPTER (CONTENT-ADDRESSED)
+# =====================================================
+# Isi chapter disimpan sebagai file di MEDIA_ROOT/<CHAPTER_BLOB_DIR>/ab/cd/<sha256>,
+# dengan sha256 dihitung dari teks HTML-nya. Chapter dengan isi identik
+# (juga lintas novel) otomatis hanya disimpan sekali. File berisi frame zstd
+# TANPA dictionary supaya tetap bisa dibaca walaupun dictionary novel
+# pemiliknya dihapus/dilatih ulang. Baca lewat mmap: tidak ada salinan
+# tambahan di Python sebelum dekompresi.
+
+
+def content_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def content_storage():
+    """'db' (kolom Chapter.content) atau 'blob' (file di blob store)."""
+    return getattr(settings, 'CHAPTER_CONTENT_STORAGE', 'db')
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, text, key=None):
+        """Simpan teks; return (key, True kalau file baru ditulis / False kalau sudah ada)."""
+        key = key or content_key(text)
+        path = self.path(key)
+        if os.path.exists(path): return key, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zstandard.ZstdCompressor(level=compression_level()).compress(text.encode('utf-8')) if text else b''
+        # Tulis ke file sementara lalu rename: pembaca tidak pernah melihat file setengah jadi
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return key, True
+
+    def get(self, key):
+        with open(self.path(key), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0: return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return zstandard.ZstdDecompressor().decompress(mm).decode('utf-8')
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def keys(self):
+        """Semua key yang tersimpan (untuk pembersihan blob yatim)."""
+        for root, dirs, names in os.walk(self.root):
+            for name in names:
+                if len(name) == 64 and '.' not in name: yield name
+
+
+def blob_store():
+    return BlobStore(os.path.join(settings.MEDIA_ROOT, getattr(settings, 'CHAPTER_BLOB_DIR', 'chapter_blobs')))
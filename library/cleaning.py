@@ -0,0 +1,348 @@
+import re
+from html import escape, unescape
+from itertools import islice
+
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup, UnicodeDammit
+
+# =====================================================
+# CLEANING DOKUMEN EPUB
+# =====================================================
+# Modul ini sengaja tidak import Django/model supaya fungsi di bawah bisa
+# dijalankan di worker ProcessPoolExecutor (spawn maupun fork).
+
+BLACKLIST_FILENAMES = [
+    'table of contents', 'contents', 'index', 'copyright',
+    'intro', 'front page', 'title page', 'acknowledgments',
+    'nav', 'menu', 'cover', 'daftar isi', 'indeks',
+    'pendahuluan', 'halaman judul'
+]
+
+NAV_LINK_TEXTS = ['prev', 'next', 'previous', 'contents', 'daftar isi', 'index']
+
+# Regex mendeteksi baris yang terlihat seperti list chapter
+REGEX_TOC = re.compile(r'^(chapter|bab|vol|volume|part|episode|bagian)\s*\d+', re.IGNORECASE)
+REGEX_CHAPTER_TITLE = re.compile(r'^(chapter|bab|episode|part|bagian|vol|volume)\s*\d+', re.IGNORECASE)
+
+
+_TAG = re.compile(r'<[^>]+>')
+_SPACES = re.compile(r'\s+')
+
+
+def plain_text(html):
+    """Teks polos chapter (tag dibuang, entity di-decode) untuk index pencarian isi."""
+    return _SPACES.sub(' ', unescape(_TAG.sub(' ', html or ''))).strip()
+
+
+def clean_document(name, html, novel_title):
+    """
+    Bersihkan satu dokumen EPUB (ITEM_DOCUMENT).
+    Return (judul, html_bersih) atau None kalau dokumen harus di-skip.
+    """
+    # 1. Parse HTML (head tidak dipakai: <title> di sana biasanya judul buku)
+    soup = BeautifulSoup(html, 'html.parser')
+    for head in soup.find_all('head'): head.decompose()
+    full_text_raw = soup.get_text(strip=True, separator='\n')
+    raw_filename = name.lower()
+
+    # -----------------------------------------------------------
+    # FILTER 1: JUDUL FILE (BLACKLIST)
+    # -----------------------------------------------------------
+    if any(x in raw_filename for x in BLACKLIST_FILENAMES):
+        # Pengecualian: Jika judul file mengandung kata 'chapter' atau 'bab', JANGAN skip
+        if 'chapter' not in raw_filename and 'bab' not in raw_filename:
+            print(f"[SKIP BLACKLIST] File: {name}")
+            return None
+
+    # -----------------------------------------------------------
+    # FILTER 2: DETEKSI TOC (DILONGGARKAN)
+    # -----------------------------------------------------------
+    lines = [l.strip() for l in full_text_raw.split('\n') if l.strip()]
+
+    chapter_line_count = 0
+    check_limit = min(len(lines), 100)
+
+    for i in range(check_limit):
+        if REGEX_TOC.match(lines[i]):
+            chapter_line_count += 1
+
+    # REVISI: Batas dinaikkan jadi 50.
+    # (Sebelumnya 10, yang membuat chapter dengan banyak "Part X" ikut terhapus)
+    if chapter_line_count > 50:
+        print(f"[SKIP TOC CONTENT] File: {name} (Found {chapter_line_count} chapter lines)")
+        return None
+
+    # -----------------------------------------------------------
+    # CLEANING SERVICE
+    # -----------------------------------------------------------
+    for s in soup(['script', 'style', 'meta', 'link']): s.decompose()
+
+    # Hapus elemen sampah crawler
+    for div in soup.find_all('div', id=['intro', 'footer', 'nav']): div.decompose()
+    for div in soup.find_all('div', class_=['footer', 'synopsis', 'nav']): div.decompose()
+
+    # Hapus Navigasi Link (Prev/Next)
+    for a in soup.find_all('a'):
+        txt = a.get_text().strip().lower()
+        if txt in NAV_LINK_TEXTS:
+            a.decompose()
+
+    # -----------------------------------------------------------
+    # HAPUS JUDUL GANDA (HEADER & PARAGRAF)
+    # -----------------------------------------------------------
+    final_title = ""
+
+    # A. Ambil & Hapus Header
+    header_tag = soup.find(['h1', 'h2', 'h3', 'title'])
+    if header_tag:
+        final_title = header_tag.get_text(strip=True)
+        header_tag.decompose()
+
+    # B. Ambil & Hapus Paragraf Judul (<p>Chapter X...)
+    for p in soup.find_all('p', limit=10):
+        text = p.get_text(strip=True)
+        if not text: continue
+
+        if REGEX_CHAPTER_TITLE.match(text):
+            if not final_title:
+                final_title = text
+            p.decompose() # Hapus dari body agar tidak dobel
+
+    # Fallback Title
+    if not final_title:
+        final_title = name
+
+    # Filter Akhir: Judul Blacklist
+    if any(x in final_title.lower() for x in BLACKLIST_FILENAMES):
+        # Pengecualian lagi untuk 'Chapter'
+        if 'chapter' not in final_title.lower():
+            return None
+
+    if final_title.strip().lower() == novel_title.strip().lower():
+        return None
+
+    # -----------------------------------------------------------
+    # HASIL
+    # -----------------------------------------------------------
+    body = soup.find('body')
+    content_html = body.decode_contents() if body else str(soup)
+    content_html = content_html.strip()
+
+    # Cek Konten Kosong (Batas diturunkan jadi 20 char)
+    if len(BeautifulSoup(content_html, "html.parser").get_text(strip=True)) < 20:
+        print(f"[SKIP EMPTY] File: {name} (Content too short)")
+        return None
+
+    return final_title, content_html
+
+
+# =====================================================
+# ENGINE LXML (SATU KALI PARSE)
+# =====================================================
+# Aturan sama persis dengan clean_document, tapi semua langkah jalan di
+# satu tree lxml: teks untuk deteksi TOC dibaca lazy (berhenti di 100
+# baris), dan panjang konten dihitung langsung dari tree tanpa parse ulang.
+
+SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+JUNK_DIV_IDS = {'intro', 'footer', 'nav'}
+JUNK_DIV_CLASSES = {'footer', 'synopsis', 'nav'}
+
+
+def _iter_strings(el):
+    """String teks di dalam `el` sesuai urutan dokumen (tanpa komentar, script & style)."""
+    if isinstance(el.tag, str) and el.tag not in SKIP_TEXT_TAGS and el.text:
+        yield el.text
+    for child in el:
+        yield from _iter_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _stripped_text(el):
+    # Setara bs4 get_text(strip=True)
+    return ''.join(s.strip() for s in _iter_strings(el))
+
+
+def _iter_lines(el):
+    # Setara baris dari bs4 get_text(strip=True, separator='\n')
+    for s in _iter_strings(el):
+        for line in s.split('\n'):
+            line = line.strip()
+            if line: yield line
+
+
+def _drop(el):
+    # Seperti decompose(): buang elemen beserta isinya, tapi tail tetap ada
+    if el.getparent() is not None:
+        el.drop_tree()
+
+
+def _has_text(el, minimum):
+    total = 0
+    for s in _iter_strings(el):
+        total += len(s.strip())
+        if total >= minimum: return True
+    return False
+
+
+def clean_document_lxml(name, html, novel_title):
+    """Versi lxml dari clean_document. Return (judul, html_bersih) atau None."""
+    raw_filename = name.lower()
+
+    # FILTER 1: JUDUL FILE (BLACKLIST) -- dicek sebelum parse
+    if any(x in raw_filename for x in BLACKLIST_FILENAMES):
+        if 'chapter' not in raw_filename and 'bab' not in raw_filename:
+            print(f"[SKIP BLACKLIST] File: {name}")
+            return None
+
+    # Encoding ditentukan di sini (deklarasi <?xml?>/meta, lalu tebakan seperti bs4);
+    # tanpa itu libxml2 membaca XHTML UTF-8 tanpa deklarasi sebagai Latin-1
+    if isinstance(html, str):
+        html, encoding = html.encode('utf-8'), 'utf-8'
+    else:
+        encoding = UnicodeDammit(html, is_html=True).original_encoding or 'utf-8'
+    try:
+        root = lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding=encoding))
+    except etree.ParserError:
+        print(f"[SKIP EMPTY] File: {name} (Content too short)")
+        return None
+    for head in list(root.iter('head')): _drop(head)
+
+    # FILTER 2: DETEKSI TOC
+    chapter_line_count = sum(1 for line in islice(_iter_lines(root), 100) if REGEX_TOC.match(line))
+    if chapter_line_count > 50:
+        print(f"[SKIP TOC CONTENT] File: {name} (Found {chapter_line_count} chapter lines)")
+        return None
+
+    # CLEANING SERVICE
+    for el in list(root.iter('script', 'style', 'meta', 'link')): _drop(el)
+    for div in list(root.iter('div')):
+        classes = div.get('class')
+        if div.get('id') in JUNK_DIV_IDS:
+            _drop(div)
+        elif classes is not None and (classes in JUNK_DIV_CLASSES or JUNK_DIV_CLASSES.intersection(classes.split())):
+            _drop(div)
+    for a in list(root.iter('a')):
+        if a.text_content().strip().lower() in NAV_LINK_TEXTS:
+            _drop(a)
+
+    # HAPUS JUDUL GANDA (HEADER & PARAGRAF)
+    final_title = ""
+    header_tag = next(root.iter('h1', 'h2', 'h3', 'title'), None)
+    if header_tag is not None:
+        final_title = _stripped_text(header_tag)
+        _drop(header_tag)
+
+    for p in list(islice(root.iter('p'), 10)):
+        text = _stripped_text(p)
+        if not text: continue
+        if REGEX_CHAPTER_TITLE.match(text):
+            if not final_title:
+                final_title = text
+            _drop(p)
+
+    if not final_title:
+        final_title = name
+
+    if any(x in final_title.lower() for x in BLACKLIST_FILENAMES):
+        if 'chapter' not in final_title.lower():
+            return None
+
+    if final_title.strip().lower() == novel_title.strip().lower():
+        return None
+
+    # HASIL (panjang teks diukur dari tree yang sama)
+    body = root.find('body')
+    container = body if body is not None else root
+    if not _has_text(container, 20):
+        print(f"[SKIP EMPTY] File: {name} (Content too short)")
+        return None
+
+    if body is not None:
+        content_html = escape(body.text or '', quote=False) + ''.join(
+            lxml.html.tostring(child, encoding='unicode') for child in body
+        )
+    else:
+        content_html = lxml.html.tostring(root, encoding='unicode')
+
+    return final_title, content_html.strip()
+
+
+# =====================================================
+# TXT (STREAMING)
+# =====================================================
+# File TXT dibaca per blok dan diproses lewat generator, jadi memori yang
+# dipakai hanya sebesar satu blok + satu chapter, berapapun ukuran file.
+
+TXT_BLOCK_SIZE = 64 * 1024
+
+
+def iter_txt_paragraphs(path, block_size=TXT_BLOCK_SIZE):
+    """Paragraf (dipisah baris kosong) dari file TXT, dibaca per blok."""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        rest = ''
+        while True:
+            block = f.read(block_size)
+            if not block: break
+            parts = (rest + block).split('\n\n')
+            # Potongan terakhir mungkin belum utuh, simpan untuk blok berikutnya
+            rest = parts.pop()
+            for p in parts:
+                if p.strip(): yield p
+        if rest.strip(): yield rest
+
+
+def iter_txt_chapters(paragraphs, chunk_size=30, mode='chunk', max_paragraphs=1000):
+    """
+    Susun paragraf jadi chapter. Yield (judul, list_paragraf).
+    - mode 'chunk'  : tiap `chunk_size` paragraf jadi "Part N" (perilaku lama).
+    - mode 'heading': paragraf yang diawali "Chapter 12"/"Bab 3"/dst. membuka
+      chapter baru; teks sebelum heading pertama jadi "Prologue". Chapter
+      dipotong tiap `max_paragraphs` agar memori tetap terbatas.
+    """
+    if mode == 'chunk':
+        chunk = []
+        for p in paragraphs:
+            chunk.append(p)
+            if len(chunk) == chunk_size:
+                yield None, chunk
+                chunk = []
+        if chunk: yield None, chunk
+        return
+
+    if mode != 'heading':
+        raise ValueError(f"Mode TXT tidak dikenal: {mode}")
+
+    title, chunk, piece = "Prologue", [], 1
+    for p in paragraphs:
+        first_line, _, remainder = p.strip().partition('\n')
+        if len(first_line) <= 100 and REGEX_CHAPTER_TITLE.match(first_line):
+            if chunk: yield (title if piece == 1 else f"{title} ({piece})"), chunk
+            title, chunk, piece = first_line.strip(), [], 1
+            if remainder.strip(): chunk.append(remainder)
+            continue
+
+        chunk.append(p)
+        if len(chunk) >= max_paragraphs:
+            yield (title if piece == 1 else f"{title} ({piece})"), chunk
+            chunk, piece = [], piece + 1
+    if chunk: yield (title if piece == 1 else f"{title} ({piece})"), chunk
+
+
+CLEANERS = {
+    'bs4': clean_document,
+    'lxml': clean_document_lxml,
+}
+
+
+def clean_document_task(task):
+    """
+    Entry point worker pool. `task` = (index, nama_file, html, judul_novel, engine).
+    Return (judul, html_bersih, index) atau None; index = posisi dokumen di
+    EPUB supaya parent bisa memberi `order` sesuai urutan aslinya.
+    """
+    index, name, html, novel_title, engine = task
+    result = CLEANERS[engine](name, html, novel_title)
+    if result is None: return None
+    return result[0], result[1], index
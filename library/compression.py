@@ -0,0 +1,85 @@
+import secrets
+from functools import lru_cache
+
+import zstandard
+from django.conf import settings
+
+# =====================================================
+# KOMPRESI KONTEN CHAPTER (ZSTD + DICTIONARY PER NOVEL)
+# =====================================================
+# Chapter dari satu novel berbagi banyak markup & kosakata, jadi dictionary
+# zstd yang dilatih dari chapter novel itu sendiri memperkecil tiap chapter
+# jauh lebih baik daripada kompresi per chapter biasa. ID dictionary ikut
+# tertulis di header frame zstd, jadi dekompresi cukup membaca header.
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# ID < 32768 dicadangkan zstd; sisanya cukup acak supaya tidak pernah dipakai ulang
+DICT_ID_MIN, DICT_ID_MAX = 32768, 2 ** 31 - 1
+
+# Batas sampel training supaya memori tetap kecil untuk novel ribuan chapter
+MAX_TRAINING_SAMPLES = 300
+
+
+def compression_level():
+    return getattr(settings, 'CHAPTER_ZSTD_LEVEL', 6)
+
+
+@lru_cache(maxsize=256)
+def load_dictionary(dict_id):
+    """ZstdCompressionDict untuk ID tertentu (cache per proses, isinya tidak pernah berubah)."""
+    from .models import ContentDictionary
+
+    data = ContentDictionary.objects.filter(pk=dict_id).values_list('data', flat=True).first()
+    if data is None:
+        raise ContentDictionary.DoesNotExist(f"Dictionary zstd #{dict_id} tidak ditemukan")
+    dictionary = zstandard.ZstdCompressionDict(bytes(data))
+    dictionary.precompute_compress(level=compression_level())
+    return dictionary
+
+
+def compress(text, dict_id=None):
+    """str -> frame zstd (bytes). `dict_id` = ContentDictionary yang dipakai (opsional)."""
+    if not text: return b''
+    dictionary = load_dictionary(dict_id) if dict_id else None
+    return zstandard.ZstdCompressor(level=compression_level(), dict_data=dictionary).compress(text.encode('utf-8'))
+
+
+def decompress(data):
+    """
+    Kebalikan compress(). Data lama yang belum dikompres (UTF-8 polos hasil
+    migrasi) dikembalikan apa adanya: HTML tidak mungkin diawali magic zstd.
+    """
+    if data is None or isinstance(data, str): return data
+    data = bytes(data)
+    if not data.startswith(ZSTD_MAGIC):
+        return data.decode('utf-8')
+    dict_id = frame_dict_id(data)
+    dictionary = load_dictionary(dict_id) if dict_id else None
+    return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(data).decode('utf-8')
+
+
+def frame_dict_id(data):
+    """ID dictionary di header frame (0 = tanpa dictionary), None kalau bukan data zstd."""
+    data = bytes(data or b'')
+    if not data.startswith(ZSTD_MAGIC): return None
+    return zstandard.get_frame_parameters(data).dict_id
+
+
+def train_dictionary(samples):
+    """
+    Latih dictionary dari list str (isi chapter). Return (dict_id, bytes)
+    atau None kalau sampel terlalu sedikit / training gagal.
+    """
+    samples = [s.encode('utf-8') for s in samples[:MAX_TRAINING_SAMPLES] if s]
+    if len(samples) < getattr(settings, 'CHAPTER_ZSTD_MIN_SAMPLES', 8): return None
+
+    # zstd menyarankan dictionary ~1/10 total sampel; dibatasi setting
+    total = sum(len(s) for s in samples)
+    size = min(getattr(settings, 'CHAPTER_ZSTD_DICT_SIZE', 64 * 1024), max(1024, total // 10))
+    dict_id = DICT_ID_MIN + secrets.randbelow(DICT_ID_MAX - DICT_ID_MIN)
+    try:
+        dictionary = zstandard.train_dictionary(size, samples, dict_id=dict_id, level=compression_level())
+    except zstandard.ZstdError:
+        return None
+    return dict_id, dictionary.as_bytes()
@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from .models import Chapter, Novel, NovelVote
+
+# =====================================================
+# COUNTER NOVEL (DENORMALISASI)
+# =====================================================
+# chapter_count, vote_count/vote_sum/rating_score dan latest_chapter_* di
+# Novel adalah salinan hasil agregasi supaya list (home, katalog, tag) tidak
+# menghitung ulang per kartu. Semua ditulis lewat UPDATE satu statement
+# (subquery / F()) sehingga tidak ada read-modify-write di Python.
+# `manage.py recount_novels` menghitung ulang semuanya dari nol.
+
+COUNTER_FIELDS = (
+    'chapter_count', 'latest_chapter_id', 'latest_chapter_index', 'latest_chapter_title',
+    'vote_count', 'vote_sum', 'rating_score',
+)
+
+
+def _average():
+    return Coalesce(
+        Round(Cast('vote_sum', FloatField()) / NullIf('vote_count', 0), 1),
+        Value(0.0),
+    )
+
+
+def chapter_stats():
+    """Ekspresi kolom chapter_count & latest_chapter_* untuk Novel.objects.update()."""
+    chapters = Chapter.objects.filter(novel=OuterRef('pk')).order_by()
+    latest = chapters.order_by('-order', '-id')
+    return {
+        'chapter_count': Coalesce(Subquery(chapters.values('novel').annotate(n=Count('id')).values('n')), 0),
+        'latest_chapter_id': Subquery(latest.values('id')[:1]),
+        'latest_chapter_index': Subquery(latest.values('chapter_index')[:1]),
+        'latest_chapter_title': Coalesce(Subquery(latest.values('title')[:1]), Value('')),
+    }
+
+
+def vote_stats():
+    votes = NovelVote.objects.filter(novel=OuterRef('pk')).order_by().values('novel')
+    return {
+        'vote_count': Coalesce(Subquery(votes.annotate(n=Count('id')).values('n')), 0),
+        'vote_sum': Coalesce(Subquery(votes.annotate(s=Sum('score')).values('s')), 0),
+    }
+
+
+def novels_version():
+    """
+    (jumlah novel, updated_at terbaru), berubah setiap novel ditambah, diubah
+    atau dihapus. Dipakai cache per proses (autocomplete, facet) untuk tahu
+    ada perubahan dari proses lain tanpa bergantung pada cache bersama.
+    """
+    row = Novel.objects.aggregate(n=Count('id'), latest=Max('updated_at'))
+    return row['n'], row['latest']
+
+
+def refresh_chapter_stats(novels, **extra):
+    return novels.update(**chapter_stats(), **extra)
+
+
+def refresh_vote_stats(novels):
+    with transaction.atomic():
+        updated = novels.update(**vote_stats())
+        novels.update(rating_score=_average())
+    return updated
+
+
+def adjust_votes(novel_id, count, total):
+    """Tambah/kurangi vote_count & vote_sum secara atomik, lalu hitung ulang rata-rata."""
+    novels = Novel.objects.filter(pk=novel_id)
+    with transaction.atomic():
+        novels.update(vote_count=F('vote_count') + count, vote_sum=F('vote_sum') + total)
+        # Statement terpisah: nilai baru vote_* sudah terlihat di sini
+        novels.update(rating_score=_average(), updated_at=timezone.now())
+
+
+def refresh_genre_labels(novel_ids):
+    """Tulis ulang label Novel.genre ("Action, Fantasy") dari relasi genre. Return {novel_id: label}."""
+    names = {novel_id: [] for novel_id in novel_ids}
+    rows = (
+        Novel.genres.through.objects.filter(novel_id__in=names)
+        .order_by('genre__name').values_list('novel_id', 'genre__name')
+    )
+    for novel_id, name in rows: names[novel_id].append(name)
+    labels = {novel_id: ", ".join(genres)[:100] for novel_id, genres in names.items()}
+    Novel.objects.bulk_update([Novel(pk=pk, genre=label) for pk, label in labels.items()], ['genre'], batch_size=500)
+    return labels
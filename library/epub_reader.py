@@ -0,0 +1,108 @@
+import hashlib
+import posixpath
+import zipfile
+from urllib.parse import unquote
+
+from lxml import etree
+
+# =====================================================
+# EPUB READER (SEKALI BUKA, BACA LAZY)
+# =====================================================
+# Pengganti epub.read_epub untuk ingest: ebooklib memuat semua item
+# (termasuk gambar & font) ke memori setiap kali dibuka. Reader ini hanya
+# membaca container.xml + OPF, lalu isi dokumen diambil dari zip saat
+# dibutuhkan, sesuai urutan spine.
+
+NS = {
+    'container': 'urn:oasis:names:tc:opendocument:xmlns:container',
+    'opf': 'http://www.idpf.org/2007/opf',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+
+DOCUMENT_MEDIA_TYPE = 'application/xhtml+xml'
+
+
+class EpubDocument:
+    """Satu dokumen XHTML di EPUB. Isi baru dibaca dari zip saat read()."""
+
+    def __init__(self, reader, name, path):
+        self.reader = reader
+        self.name = name  # href relatif OPF, sama dengan item.get_name() di ebooklib
+        self.path = path  # path di dalam zip
+
+    def read(self):
+        return self.reader.zip.read(self.path)
+
+    def hash(self):
+        # sha256 isi mentah, dibaca per potong tanpa menahan seluruh dokumen
+        digest = hashlib.sha256()
+        with self.reader.zip.open(self.path) as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def __repr__(self):
+        return f"<EpubDocument {self.name}>"
+
+
+class EpubReader:
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        try:
+            self._load_opf()
+        except Exception:
+            self.zip.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.zip.close()
+
+    def _load_opf(self):
+        container = etree.fromstring(self.zip.read('META-INF/container.xml'))
+        rootfile = container.find('.//container:rootfile', NS)
+        opf_path = unquote(rootfile.get('full-path'))
+        self.opf_dir = posixpath.dirname(opf_path)
+        opf = etree.fromstring(self.zip.read(opf_path))
+
+        # Metadata Dublin Core: {'title': [...], 'creator': [...], ...}
+        self.metadata = {}
+        meta_el = opf.find('opf:metadata', NS)
+        if meta_el is not None:
+            for el in meta_el:
+                if not isinstance(el.tag, str) or not el.tag.startswith('{%s}' % NS['dc']): continue
+                name = etree.QName(el).localname
+                self.metadata.setdefault(name, []).append(el.text or '')
+
+        # Manifest: id -> (href, media-type)
+        self.manifest = {}
+        for item in opf.iterfind('opf:manifest/opf:item', NS):
+            self.manifest[item.get('id')] = (unquote(item.get('href', '')), item.get('media-type'))
+
+        self.spine = [ref.get('idref') for ref in opf.iterfind('opf:spine/opf:itemref', NS)]
+
+    def get_metadata(self, name):
+        return self.metadata.get(name, [])
+
+    def documents(self):
+        """
+        Dokumen XHTML sesuai urutan baca (spine), lalu dokumen di manifest
+        yang tidak ada di spine. Isi belum dibaca.
+        """
+        ordered = [i for i in self.spine if i in self.manifest]
+        in_spine = set(ordered)
+        ordered += [i for i in self.manifest if i not in in_spine]
+
+        docs, seen = [], set()
+        for item_id in ordered:
+            href, media_type = self.manifest[item_id]
+            if media_type != DOCUMENT_MEDIA_TYPE or href in seen: continue
+            seen.add(href)
+            docs.append(EpubDocument(self, href, posixpath.normpath(posixpath.join(self.opf_dir, href))))
+        return docs
@@ -0,0 +1,175 @@
+import time
+from collections import Counter
+from itertools import product
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+
+from .counters import novels_version
+from .models import FacetCount, Genre, Novel, Tag
+
+# =====================================================
+# FACET COUNT (GENRE / STATUS / TAG)
+# =====================================================
+# FacetCount menyimpan jumlah novel per (genre_id, status, tag_id), diperbarui
+# per novel secara inkremental: state lama (Novel.facet_state) dibandingkan
+# dengan state sekarang, lalu hanya key yang berubah digeser +1/-1 dengan F().
+# Endpoint facet cukup menjumlah baris cube yang kecil ini (bukan GROUP BY
+# seluruh tabel novel), dan hasil per kombinasi filter di-cache dengan versi
+# data. Versi dibaca dari DB (bukan counter di cache, yang di LocMem tidak
+# terlihat proses lain): novels_version() plus id terbesar cube (berubah saat
+# rebuild), dicek paling sering tiap FACET_REFRESH_INTERVAL detik per proses.
+# `manage.py rebuild_facets` menghitung ulang semuanya dari nol.
+
+FACET_TIMEOUT = 60 * 60
+_version = {'value': None, 'checked_at': None}
+
+
+def refresh_interval():
+    return getattr(settings, 'FACET_REFRESH_INTERVAL', 30)
+
+
+def facet_keys(state):
+    # Novel masuk ke baris "semua" (0) dan ke tiap genre / tag miliknya
+    if not state or 'genres' not in state: return set()
+    status = state['status']
+    return {(g, status, t) for g, t in product([0, *state['genres']], [0, *state['tags']])}
+
+
+def current_state(novel_id):
+    status = Novel.objects.filter(pk=novel_id).values_list('status', flat=True).first()
+    if status is None: return None
+    genres = sorted(Novel.genres.through.objects.filter(novel_id=novel_id).values_list('genre_id', flat=True))
+    tags = sorted(Novel.tags.through.objects.filter(novel_id=novel_id).values_list('tag_id', flat=True))
+    return {'genres': genres, 'status': status, 'tags': tags}
+
+
+def facet_filter(keys):
+    match = Q()
+    for genre_id, status, tag_id in keys:
+        match |= Q(genre_id=genre_id, status=status, tag_id=tag_id)
+    return match
+
+
+def apply_facet_delta(added, removed):
+    """Geser FacetCount: +1 untuk key di `added`, -1 untuk key di `removed`."""
+    if removed:
+        FacetCount.objects.filter(facet_filter(removed)).update(count=F('count') - 1)
+    if added:
+        # Baris nol dulu (abaikan yang sudah ada), lalu increment atomik
+        FacetCount.objects.bulk_create(
+            [FacetCount(genre_id=g, status=s, tag_id=t) for g, s, t in added], ignore_conflicts=True
+        )
+        FacetCount.objects.filter(facet_filter(added)).update(count=F('count') + 1)
+    if added or removed:
+        transaction.on_commit(bump_facet_version)
+
+
+def sync_novel_facets(novel_id):
+    """Samakan kontribusi satu novel di FacetCount dengan data sekarang. Return state baru."""
+    with transaction.atomic():
+        old = Novel.objects.select_for_update().filter(pk=novel_id).values_list('facet_state', flat=True).first()
+        new = current_state(novel_id)
+        if new is None or old == new: return new
+        old_keys, new_keys = facet_keys(old), facet_keys(new)
+        apply_facet_delta(new_keys - old_keys, old_keys - new_keys)
+        Novel.objects.filter(pk=novel_id).update(facet_state=new)
+    return new
+
+
+def remove_novel_facets(state):
+    """Dipanggil saat novel dihapus, dengan facet_state terakhirnya."""
+    apply_facet_delta(set(), facet_keys(state))
+
+
+def rebuild_facets():
+    """Hitung ulang seluruh cube dari tabel novel + genre + tag. Return jumlah novel."""
+    genres, tags = {}, {}
+    for novel_id, genre_id in Novel.genres.through.objects.values_list('novel_id', 'genre_id').iterator():
+        genres.setdefault(novel_id, []).append(genre_id)
+    for novel_id, tag_id in Novel.tags.through.objects.values_list('novel_id', 'tag_id').iterator():
+        tags.setdefault(novel_id, []).append(tag_id)
+
+    counts, states = Counter(), []
+    for novel_id, status in Novel.objects.values_list('id', 'status').iterator():
+        state = {'genres': sorted(genres.get(novel_id, [])), 'status': status, 'tags': sorted(tags.get(novel_id, []))}
+        counts.update(facet_keys(state))
+        states.append(Novel(pk=novel_id, facet_state=state))
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(
+            FacetCount(genre_id=g, status=s, tag_id=t, count=n) for (g, s, t), n in counts.items()
+        )
+        Novel.objects.bulk_update(states, ['facet_state'], batch_size=500)
+    transaction.on_commit(bump_facet_version)
+    return len(states)
+
+
+def facet_version():
+    now = time.monotonic()
+    if _version['checked_at'] is None or now - _version['checked_at'] >= refresh_interval():
+        count, latest = novels_version()
+        cube = FacetCount.objects.aggregate(n=Max('id'))['n'] or 0
+        _version['value'] = f"{count}-{latest.timestamp() if latest else 0}-{cube}"
+        _version['checked_at'] = now
+    return _version['value']
+
+
+def bump_facet_version():
+    """Perubahan di proses ini: baca ulang versi dari DB di request berikutnya."""
+    _version['checked_at'] = None
+
+
+def resolve_tag(tag):
+    if not tag: return None
+    return Tag.objects.filter(Q(slug__iexact=tag) | Q(name__iexact=tag)).values_list('id', flat=True).first()
+
+
+def resolve_genre(genre):
+    if not genre: return None
+    return Genre.objects.filter(Q(slug__iexact=genre) | Q(name__iexact=genre)).values_list('id', flat=True).first()
+
+
+def facet_counts(genre=None, status=None, tag=None):
+    """
+    Jumlah novel per genre, status dan tag untuk state filter ini. Tiap facet
+    dihitung dengan filter facet lain saja (bukan dirinya sendiri), supaya
+    pilihan lain di facet yang sama tetap terlihat.
+    """
+    key = f"facets:{facet_version()}:{(genre or '').lower()}:{(status or '').lower()}:{(tag or '').lower()}"
+    cached = cache.get(key)
+    if cached is not None: return cached
+
+    genre_id, tag_id = resolve_genre(genre), resolve_tag(tag)
+    if (genre and genre_id is None) or (tag and tag_id is None):
+        result = {'total': 0, 'genres': [], 'statuses': [], 'tags': []}
+        cache.set(key, result, FACET_TIMEOUT)
+        return result
+
+    cube = FacetCount.objects.filter(count__gt=0)
+    by_status = Q(status__iexact=status) if status else Q()
+    rows = cube.filter(genre_id=genre_id or 0, tag_id=tag_id or 0)
+
+    def grouped(queryset, field):
+        return list(
+            queryset.values(field).annotate(n=Sum('count')).order_by('-n', field).values_list(field, 'n')
+        )
+
+    def labelled(model, counts):
+        names = {
+            pk: (slug, name) for pk, slug, name in
+            model.objects.filter(pk__in=[pk for pk, _ in counts]).values_list('id', 'slug', 'name')
+        }
+        return [{'slug': names[pk][0], 'name': names[pk][1], 'count': n} for pk, n in counts if pk in names]
+
+    result = {
+        'total': rows.filter(by_status).aggregate(n=Sum('count'))['n'] or 0,
+        'genres': labelled(Genre, grouped(cube.filter(by_status, tag_id=tag_id or 0, genre_id__gt=0), 'genre_id')),
+        'statuses': [{'value': value, 'count': n} for value, n in grouped(rows, 'status')],
+        'tags': labelled(Tag, grouped(cube.filter(by_status, genre_id=genre_id or 0, tag_id__gt=0), 'tag_id')),
+    }
+    cache.set(key, result, FACET_TIMEOUT)
+    return result
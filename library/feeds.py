@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Novel
+from .serializers import NovelListSerializer
+from .trending import trending_novels
+
+# =====================================================
+# SNAPSHOT HOME FEED
+# =====================================================
+# Bagian home yang sama untuk semua orang (hot/latest/completed) disimpan
+# sebagai data siap kirim di cache. Dibangun ulang saat kedaluwarsa
+# (HOME_SNAPSHOT_TIMEOUT, atau lebih cepat lewat cron `manage.py
+# refresh_home_feed`) dan dihapus lewat signals saat novel berubah.
+
+HOME_SNAPSHOT_KEY = 'home-snapshot'
+
+
+def snapshot_timeout():
+    return getattr(settings, 'HOME_SNAPSHOT_TIMEOUT', 300)
+
+
+def hot_novels(limit):
+    # Ranking trending, sisanya diisi urut total views (compute_trending belum
+    # pernah jalan, atau bucket sepi) supaya bagian hot tidak pernah memendek
+    ranked = trending_novels(limit)
+    if len(ranked) < limit:
+        ranked += Novel.objects.exclude(pk__in=[n.pk for n in ranked]).order_by('-views')[:limit - len(ranked)]
+    return ranked
+
+
+def build_home_snapshot():
+    snapshot = {
+        'hot': NovelListSerializer(hot_novels(6), many=True).data,
+        'latest': NovelListSerializer(Novel.objects.order_by('-uploaded_at')[:10], many=True).data,
+        'completed': NovelListSerializer(Novel.objects.filter(status='Completed')[:5], many=True).data,
+        'generated_at': timezone.now().isoformat(),
+    }
+    cache.set(HOME_SNAPSHOT_KEY, snapshot, snapshot_timeout())
+    return snapshot
+
+
+def home_snapshot():
+    snapshot = cache.get(HOME_SNAPSHOT_KEY)
+    return snapshot if snapshot is not None else build_home_snapshot()
+
+
+def invalidate_home_snapshot():
+    cache.delete(HOME_SNAPSHOT_KEY)
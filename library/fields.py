@@ -0,0 +1,106 @@
+from django import forms
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from .blobstore import blob_store, content_key, content_storage
+from .compression import compress, decompress
+
+# =====================================================
+# FIELD KONTEN TERKOMPRESI
+# =====================================================
+
+# Nilai untuk bulk_update saat isi dipindah ke blob store: kolom jadi NULL.
+# (None biasa tidak bisa dipakai: descriptor di bawah akan memuat isi blob-nya.)
+IN_BLOB_STORE = models.Value(None, output_field=models.BinaryField())
+
+
+class BlobContentDescriptor(DeferredAttribute):
+    """Kolom NULL + hash terisi = isi ada di blob store; dibaca saat pertama diakses."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None: return self
+        value = super().__get__(instance, cls)
+        key = getattr(instance, self.field.hash_field) if value is None else None
+        if key:
+            value = instance.__dict__[self.field.attname] = blob_store().get(key)
+        return value
+
+    def __set__(self, instance, value):
+        # Data descriptor: __get__ tetap dipanggil walaupun nilai sudah ada di __dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedContentField(models.BinaryField):
+    """
+    Teks panjang yang disimpan sebagai frame zstd (kolom BLOB/bytea).
+    Di Python nilainya tetap str, jadi serializer, admin, dan kode lain
+    tidak perlu tahu soal kompresi.
+
+    Saat save() / bulk_create(), dictionary diambil dari
+    `instance.get_content_dictionary()` (ID ContentDictionary atau None).
+    Jalur tanpa instance (bulk_update, queryset.update) dikompres tanpa
+    dictionary; nilai bytes dianggap sudah terkompresi dan disimpan apa adanya.
+
+    Dengan `hash_field` & `length_field`, tiap save juga mengisi sha256 dan
+    panjang teks. Kalau CHAPTER_CONTENT_STORAGE = 'blob', teks ditulis ke
+    blob store (lihat blobstore.py) dan kolomnya dibiarkan NULL. Field hash &
+    panjang harus didefinisikan SETELAH field ini di model, karena nilainya
+    diisi di pre_save field ini.
+    """
+
+    description = "Teks terkompresi zstd"
+    empty_values = [None, '', b'']
+
+    def __init__(self, *args, hash_field=None, length_field=None, **kwargs):
+        self.hash_field = hash_field
+        self.length_field = length_field
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+        if hash_field: self.descriptor_class = BlobContentDescriptor
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop('editable', None)
+        if self.hash_field: kwargs['hash_field'] = self.hash_field
+        if self.length_field: kwargs['length_field'] = self.length_field
+        return name, path, args, kwargs
+
+    def get_default(self):
+        default = super().get_default()
+        return '' if default == b'' else default
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str): return value
+        return decompress(value)
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if isinstance(value, str) and self.hash_field:
+            key = content_key(value)
+            setattr(model_instance, self.hash_field, key)
+            if self.length_field: setattr(model_instance, self.length_field, len(value))
+            if content_storage() == 'blob':
+                blob_store().put(value, key)
+                return None
+        if isinstance(value, str):
+            get_dictionary = getattr(model_instance, 'get_content_dictionary', None)
+            return compress(value, get_dictionary() if get_dictionary else None)
+        return value
+
+    def bulk_value(self, model_instance):
+        """Nilai kolom siap dipakai bulk_update (yang tidak memanggil pre_save)."""
+        value = self.pre_save(model_instance, False)
+        return IN_BLOB_STORE if value is None else value
+
+    def get_prep_value(self, value):
+        if isinstance(value, str): return compress(value)
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'form_class': forms.CharField, 'widget': forms.Textarea, **kwargs})
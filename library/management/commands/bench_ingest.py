@@ -0,0 +1,198 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from library.benchmark import StageTimer, build_fake_epub, build_fake_txt, peak_rss_kb, quiet
+from library.cleaning import CLEANERS, iter_txt_chapters, iter_txt_paragraphs
+from library.epub_reader import EpubReader
+from library.models import Novel
+from library.utils import ChapterBatchWriter, chapter_index_for, generate_chapters, get_epub_metadata, source_hash
+
+MIN_CHAPTERS, MAX_CHAPTERS = 10, 5000
+BUILDERS = {'epub': build_fake_epub, 'txt': build_fake_txt}
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def _str_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ingest dengan EPUB/TXT sintetis (Faker): ukur metadata, parse, cleaning "
+        "dan insert DB secara terpisah, plus peak RSS, lalu simpan hasil ke JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapters', type=_int_list, default=[10, 100, 1000],
+                            help=f"Daftar jumlah chapter, pisah koma ({MIN_CHAPTERS}-{MAX_CHAPTERS}).")
+        parser.add_argument('--paragraphs', type=int, default=20, help="Paragraf per chapter.")
+        parser.add_argument('--formats', type=_str_list, default=['epub', 'txt'], help="epub,txt")
+        parser.add_argument('--cleaners', type=_str_list, default=None,
+                            help="Engine cleaning EPUB yang dibandingkan (default settings.CHAPTER_CLEANER).")
+        parser.add_argument('--repeat', type=int, default=1, help="Ulangi tiap kasus N kali; dicatat waktu terbaik.")
+        parser.add_argument('--seed', type=int, default=1234)
+        parser.add_argument('--output', default='bench_ingest.json', help="File JSON hasil ('-' = stdout saja).")
+        parser.add_argument('--label', default='', help="Catatan bebas, mis. nama branch/perubahan.")
+
+    def handle(self, *args, **options):
+        cleaners = options['cleaners'] or [getattr(settings, 'CHAPTER_CLEANER', 'bs4')]
+        for name in cleaners:
+            if name not in CLEANERS: raise CommandError(f"Cleaner tidak dikenal: {name}")
+        for fmt in options['formats']:
+            if fmt not in BUILDERS: raise CommandError(f"Format tidak dikenal: {fmt}")
+        for n in options['chapters']:
+            if not MIN_CHAPTERS <= n <= MAX_CHAPTERS:
+                raise CommandError(f"Jumlah chapter harus {MIN_CHAPTERS}-{MAX_CHAPTERS}: {n}")
+
+        results = []
+        workdir = tempfile.mkdtemp(prefix='bench_ingest_')
+        try:
+            # File sintetis ditulis langsung di MEDIA_ROOT sementara, jadi Novel
+            # cukup menunjuk namanya tanpa menyalin file
+            with override_settings(MEDIA_ROOT=workdir):
+                # Kecil -> besar, supaya kenaikan peak RSS bisa dibaca per kasus
+                for chapters in sorted(options['chapters']):
+                    for fmt in options['formats']:
+                        name = f"bench_{chapters}.{fmt}"
+                        size = BUILDERS[fmt](os.path.join(workdir, name), chapters, options['paragraphs'], options['seed'])
+                        for cleaner in (cleaners if fmt == 'epub' else [None]):
+                            runs = [self.measure(fmt, name, cleaner) for _ in range(max(1, options['repeat']))]
+                            result = self.summarize(fmt, chapters, options['paragraphs'], size, cleaner, runs)
+                            results.append(result)
+                            self.report(result)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        payload = {'meta': self.meta(options, cleaners), 'results': results}
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(payload, indent=2))
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Hasil disimpan ke {options['output']}"))
+
+    # --- Pengukuran ---
+    def measure(self, fmt, name, cleaner):
+        """Satu putaran; semua tulis DB di-rollback supaya putaran berikut identik."""
+        timer = StageTimer()
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        with quiet(), transaction.atomic():
+            if fmt == 'epub':
+                title, written = self.measure_epub(timer, name, path, cleaner)
+            else:
+                title, written = self.measure_txt(timer, name, path)
+
+            # Pipeline lengkap generate_chapters sebagai pembanding total
+            novel = Novel.objects.create(title=title, epub_file=name)
+            with timer.stage('total'):
+                generate_chapters(novel, cleaner=cleaner, workers=1)
+            transaction.set_rollback(True)
+        return timer, written
+
+    def measure_epub(self, timer, name, path, cleaner):
+        with timer.stage('metadata'):
+            meta = get_epub_metadata(path)
+        title = meta['title'] or name
+
+        with timer.stage('parse'):
+            with EpubReader(path) as reader:
+                raw = [(doc.name, doc.read()) for doc in reader.documents()]
+
+        cleaned = []
+        with timer.stage('clean'):
+            clean = CLEANERS[cleaner]
+            for doc_name, html in raw:
+                result = clean(doc_name, html, title)
+                if result is not None:
+                    cleaned.append((result, source_hash(html)))
+        del raw
+
+        with timer.stage('insert'):
+            writer = ChapterBatchWriter(Novel.objects.create(title=title, epub_file=name))
+            for order, ((chap_title, content), h) in enumerate(cleaned, 1):
+                writer.add(chap_title, content, order, chapter_index_for(chap_title, order), source_hash=h)
+            writer.close()
+        return title, writer.written
+
+    def measure_txt(self, timer, name, path):
+        novel_title = os.path.splitext(name)[0]
+        with timer.stage('parse'):
+            chapters = [
+                (title, "".join(f"<p>{line.strip()}</p>" for line in lines))
+                for title, lines in iter_txt_chapters(
+                    iter_txt_paragraphs(path),
+                    chunk_size=getattr(settings, 'TXT_CHUNK_SIZE', 30),
+                    mode=getattr(settings, 'TXT_CHAPTER_MODE', 'chunk'),
+                )
+            ]
+
+        with timer.stage('insert'):
+            writer = ChapterBatchWriter(Novel.objects.create(title=novel_title, epub_file=name))
+            for order, (title, body) in enumerate(chapters, 1):
+                title = title or f"Part {order}"
+                writer.add(title, body, order, chapter_index_for(title, order), source_hash=source_hash(body))
+            writer.close()
+        return novel_title, writer.written
+
+    # --- Laporan ---
+    def summarize(self, fmt, chapters, paragraphs, size, cleaner, runs):
+        stages = {}
+        for timer, _ in runs:
+            for stage, seconds in timer.seconds.items():
+                stages.setdefault(stage, []).append(round(seconds, 6))
+        total = min(stages['total'])
+        return {
+            'format': fmt,
+            'chapters': chapters,
+            'paragraphs': paragraphs,
+            'bytes': size,
+            'cleaner': cleaner,
+            'chapters_written': runs[-1][1],
+            'seconds': {stage: min(values) for stage, values in stages.items()},
+            'runs': stages,
+            'chapters_per_second': round(runs[-1][1] / total, 1) if total else None,
+            'peak_rss_kb': {stage: runs[-1][0].rss_kb[stage] for stage in runs[-1][0].rss_kb},
+        }
+
+    def report(self, result):
+        seconds = " ".join(f"{stage}={value:.3f}s" for stage, value in result['seconds'].items())
+        cleaner = f"/{result['cleaner']}" if result['cleaner'] else ""
+        self.stdout.write(
+            f"[{result['format']}{cleaner}] {result['chapters']} chapter ({result['bytes'] / 1024:.0f} KB): "
+            f"{seconds} | {result['chapters_per_second']} chapter/s | peak RSS {peak_rss_kb() / 1024:.0f} MB"
+        )
+
+    def meta(self, options, cleaners):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                cwd=settings.BASE_DIR, timeout=5,
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            commit = ''
+        return {
+            'label': options['label'],
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+            'cleaners': cleaners,
+            'batch_size': getattr(settings, 'CHAPTER_BATCH_SIZE', 500),
+            'txt_mode': getattr(settings, 'TXT_CHAPTER_MODE', 'chunk'),
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+        }
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import ExpressionWrapper, F
+
+from library.compression import MAX_TRAINING_SAMPLES, compress, decompress, frame_dict_id
+from library.models import Chapter, ContentDictionary, Novel
+
+
+class Command(BaseCommand):
+    help = (
+        "Kompres ulang konten chapter dengan dictionary zstd per novel (latih dictionary "
+        "kalau belum ada), per batch, lalu laporkan ukuran yang dihemat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--novel', type=int, action='append', help="Hanya novel ini (boleh diulang).")
+        parser.add_argument('--batch-size', type=int, default=None, help="Chapter per transaksi (default CHAPTER_BATCH_SIZE).")
+        parser.add_argument('--retrain', action='store_true', help="Latih dictionary baru walaupun sudah ada.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or getattr(settings, 'CHAPTER_BATCH_SIZE', 500)
+        novels = Novel.objects.filter(chapters__isnull=False).distinct().order_by('id')
+        if options['novel']: novels = novels.filter(pk__in=options['novel'])
+
+        total_before = total_after = total_rewritten = 0
+        for novel in novels.iterator():
+            if novel.content_dictionary_id is None or options['retrain']:
+                samples = list(
+                    Chapter.objects.filter(novel=novel).order_by('order', 'id')
+                    .values_list('content', flat=True)[:MAX_TRAINING_SAMPLES]
+                )
+                if not ContentDictionary.train_for(novel, samples):
+                    self.stdout.write(f"[{novel.pk}] {novel.title}: sampel kurang, dikompres tanpa dictionary")
+
+            before, after, rewritten = self.compress_novel(novel, batch_size)
+            total_before += before
+            total_after += after
+            total_rewritten += rewritten
+            self.stdout.write(f"[{novel.pk}] {novel.title}: {rewritten} chapter ditulis ulang, {self.describe(before, after)}")
+
+            # Dictionary lama tidak dipakai chapter mana pun lagi
+            ContentDictionary.objects.filter(novel=novel).exclude(pk=novel.content_dictionary_id).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Selesai: {total_rewritten} chapter ditulis ulang, {self.describe(total_before, total_after)}"
+        ))
+
+    def compress_novel(self, novel, batch_size):
+        """Tulis ulang chapter yang belum memakai dictionary aktif. Return (byte_awal, byte_akhir, jumlah)."""
+        dict_id = novel.content_dictionary_id or 0
+        before = after = rewritten = 0
+        # Baca kolom mentah (tanpa dekompresi otomatis) supaya ukuran asli terukur.
+        # Chapter yang isinya di blob store (kolom NULL) dilewati
+        rows = Chapter.objects.filter(novel=novel, content__isnull=False).annotate(
+            raw=ExpressionWrapper(F('content'), output_field=models.BinaryField())
+        ).order_by('id').values_list('id', 'raw')
+
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch: break
+            last_id = batch[-1][0]
+
+            updates = []
+            for pk, raw in batch:
+                raw = bytes(raw or b'')
+                before += len(raw)
+                if frame_dict_id(raw) == dict_id:
+                    after += len(raw)
+                    continue
+                data = compress(decompress(raw), dict_id)
+                after += len(data)
+                updates.append(Chapter(pk=pk, content=data))
+
+            if updates:
+                with transaction.atomic():
+                    Chapter.objects.bulk_update(updates, ['content'])
+                rewritten += len(updates)
+        return before, after, rewritten
+
+    def describe(self, before, after):
+        saved = before - after
+        percent = saved * 100 / before if before else 0
+        return f"{before / 1024:.0f} KB -> {after / 1024:.0f} KB (hemat {saved / 1024:.0f} KB, {percent:.1f}%)"
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from library.feeds import invalidate_home_snapshot
+from library.models import TrendingRank
+from library.trending import compute_trending, half_life_hours, window_hours
+from library.viewcounts import view_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Hitung ulang ranking trending (view per jam dengan peluruhan eksponensial) ke tabel "
+        "TrendingRank. Jalankan berkala, misalnya tiap 10-15 menit lewat cron."
+    )
+
+    def handle(self, *args, **options):
+        view_buffer.flush()  # view tertunda milik proses ini
+        ranked = compute_trending()
+        invalidate_home_snapshot()
+        top = ', '.join(f"{r.novel.title} ({r.score:.1f})" for r in TrendingRank.objects.select_related('novel')[:3])
+        self.stdout.write(self.style.SUCCESS(
+            f"{ranked} novel diranking (half-life {half_life_hours()} jam, window {window_hours()} jam). Teratas: {top or '-'}"
+        ))
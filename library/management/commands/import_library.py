@@ -0,0 +1,177 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from library.models import Novel
+from library.utils import get_epub_metadata, ingest_novel
+
+EXTENSIONS = ('.epub', '.txt')
+
+
+def _init_worker():
+    # Dipanggil di tiap proses worker: pastikan Django siap (spawn) dan
+    # tidak ada koneksi DB warisan dari parent (fork)
+    django.setup()
+    connections.close_all()
+
+
+def _ingest_one(novel_id):
+    novel = Novel.objects.get(pk=novel_id)
+    # Cleaning dokumen tetap serial di dalam worker (paralel sudah per novel)
+    return novel_id, ingest_novel(novel, workers=1)
+
+
+class Command(BaseCommand):
+    help = "Import massal file EPUB/TXT dari sebuah folder: buat Novel lalu ekstrak chapter secara paralel."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Folder berisi file .epub / .txt (dibaca rekursif).")
+        parser.add_argument('--workers', type=int, default=1, help="Jumlah proses ingest paralel.")
+        parser.add_argument(
+            '--checkpoint',
+            help="File checkpoint JSON (default: <directory>/.import_checkpoint.json).",
+        )
+        parser.add_argument('--status', choices=[c[0] for c in Novel.STATUS_CHOICES], default='Ongoing')
+
+    def handle(self, *args, **options):
+        directory = os.path.abspath(options['directory'])
+        if not os.path.isdir(directory):
+            raise CommandError(f"Folder tidak ditemukan: {directory}")
+        workers = max(1, options['workers'])
+        self.checkpoint_path = options['checkpoint'] or os.path.join(directory, '.import_checkpoint.json')
+        self.checkpoint = self.load_checkpoint()
+
+        files = self.discover(directory)
+        todo = [rel for rel in files if self.checkpoint.get(rel, {}).get('status') != 'done']
+        self.stdout.write(f"{len(files)} file ditemukan, {len(files) - len(todo)} sudah selesai, {len(todo)} diproses")
+        if not todo: return
+
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite: penulisan antar worker tetap bergantian; job yang gagal karena lock bisa diulang dengan menjalankan perintah lagi."
+            ))
+
+        # 1. Buat Novel (serial, cepat) dan catat di checkpoint
+        pending = {}
+        for rel in todo:
+            novel = self.get_or_create_novel(directory, rel, options['status'])
+            pending[novel.pk] = rel
+
+        # 2. Ingest paralel
+        started = time.perf_counter()
+        done_novels = done_chapters = done_bytes = failed = 0
+        for novel_id, chapters, error in self.run(pending, workers):
+            rel = pending[novel_id]
+            entry = self.checkpoint[rel]
+            if error is not None:
+                failed += 1
+                entry.update(status='failed', error=str(error))
+                self.stdout.write(self.style.ERROR(f"[GAGAL] {rel}: {error}"))
+            else:
+                done_novels += 1
+                done_chapters += chapters
+                done_bytes += entry['bytes']
+                entry.update(status='done', chapters=chapters)
+                entry.pop('error', None)
+                self.stdout.write(f"[OK] {rel}: {chapters} chapter")
+            self.save_checkpoint()
+
+        # 3. Ringkasan throughput
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Selesai {done_novels} novel ({failed} gagal) dalam {elapsed:.1f}s | "
+            f"{done_novels / elapsed:.2f} novel/s, {done_chapters / elapsed:.1f} chapter/s, "
+            f"{done_bytes / elapsed / (1024 * 1024):.2f} MB/s"
+        ))
+
+    # --- Helper ---
+    def run(self, pending, workers):
+        """Yield (novel_id, jumlah_chapter, error) sesuai urutan selesai."""
+        if workers == 1:
+            for novel_id in pending:
+                try:
+                    yield _ingest_one(novel_id) + (None,)
+                except Exception as e:
+                    yield novel_id, 0, e
+            return
+
+        connections.close_all()  # jangan wariskan koneksi ke proses worker
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(_ingest_one, novel_id): novel_id for novel_id in pending}
+            for future in as_completed(futures):
+                try:
+                    yield future.result() + (None,)
+                except Exception as e:
+                    yield futures[future], 0, e
+
+    def discover(self, directory):
+        found = []
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(EXTENSIONS):
+                    found.append(os.path.relpath(os.path.join(root, name), directory))
+        return found
+
+    def get_or_create_novel(self, directory, rel, status):
+        entry = self.checkpoint.get(rel, {})
+        path = os.path.join(directory, rel)
+        novel = Novel.objects.filter(pk=entry['novel_id']).first() if entry.get('novel_id') else None
+        # Run sebelumnya mati di tengah pembuatan: file EPUB sudah tercatat di
+        # checkpoint, cari Novel-nya lewat file itu supaya tidak dobel
+        if novel is None and entry.get('epub_file'):
+            novel = Novel.objects.filter(epub_file=entry['epub_file']).first()
+        if novel is None:
+            novel = self.create_novel(path, rel, status, entry.get('epub_file'))
+
+        self.checkpoint[rel] = {
+            'novel_id': novel.pk,
+            'status': 'created',
+            'bytes': os.path.getsize(path),
+        }
+        self.save_checkpoint()
+        return novel
+
+    def create_novel(self, path, rel, status, stored=None):
+        title = os.path.splitext(os.path.basename(rel))[0]
+        fields, genres = {'title': title, 'status': status}, []
+        if rel.lower().endswith('.epub'):
+            meta = get_epub_metadata(path)
+            fields.update(
+                title=meta['title'] or title,
+                author=meta['author'],
+                synopsis=meta['synopsis'],
+            )
+            genres = meta['genres']
+
+        # Simpan file dulu dan catat namanya ('creating') sebelum Novel dibuat,
+        # jadi Novel yang sudah ter-commit selalu bisa ditemukan lagi saat resume
+        field = Novel._meta.get_field('epub_file')
+        if not (stored and field.storage.exists(stored)):
+            with open(path, 'rb') as f:
+                stored = field.storage.save(field.generate_filename(None, os.path.basename(rel)), File(f))
+            self.checkpoint[rel] = {'status': 'creating', 'epub_file': stored}
+            self.save_checkpoint()
+
+        with transaction.atomic():
+            novel = Novel.objects.create(epub_file=stored, **fields)
+            if genres: novel.set_genres(genres)
+        return novel
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path): return {}
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_checkpoint(self):
+        # Tulis ke file sementara lalu rename, supaya checkpoint tidak korup kalau proses mati
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, indent=2)
+        os.replace(tmp, self.checkpoint_path)
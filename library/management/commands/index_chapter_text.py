@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from library.models import Chapter
+from library.search import index_chapter_texts
+
+
+class Command(BaseCommand):
+    help = (
+        "Isi index pencarian isi chapter (ChapterText) untuk chapter yang sudah ada, per batch. "
+        "Chapter hasil ingest baru sudah ter-index otomatis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--novel', type=int, action='append', help="Hanya novel ini (boleh diulang).")
+        parser.add_argument('--batch-size', type=int, default=None, help="Chapter per batch (default CHAPTER_BATCH_SIZE).")
+        parser.add_argument('--all', action='store_true', help="Tulis ulang juga chapter yang sudah punya teks.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or getattr(settings, 'CHAPTER_BATCH_SIZE', 500)
+        chapters = Chapter.objects.all()
+        if options['novel']: chapters = chapters.filter(novel_id__in=options['novel'])
+        if not options['all']: chapters = chapters.filter(search_text__isnull=True)
+
+        done = last_id = 0
+        while True:
+            batch = list(
+                chapters.filter(id__gt=last_id).order_by('id')
+                .only('id', 'novel_id', 'content', 'content_hash')[:batch_size]
+            )
+            if not batch: break
+            last_id = batch[-1].pk
+            index_chapter_texts([(chap.pk, chap.novel_id, chap.content or '') for chap in batch], batch_size)
+            done += len(batch)
+            self.stdout.write(f"... {done} chapter")
+
+        self.stdout.write(self.style.SUCCESS(f"{done} chapter di-index"))
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from library.models import IngestJob
+from library.utils import claim_next_job, run_ingest_job
+
+
+class Command(BaseCommand):
+    help = "Worker antrian ingest EPUB/TXT: klaim IngestJob pending lalu proses satu per satu."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Berhenti begitu antrian kosong.")
+        parser.add_argument('--sleep', type=float, default=5.0, help="Jeda polling saat antrian kosong (detik).")
+        parser.add_argument('--max-jobs', type=int, default=0, help="Berhenti setelah N job (0 = tanpa batas).")
+        parser.add_argument(
+            '--requeue-stale', type=int, default=0, metavar='MINUTES',
+            help="Kembalikan job 'running' yang lebih tua dari N menit ke pending (worker mati).",
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_stale']:
+            limit = timezone.now() - timedelta(minutes=options['requeue_stale'])
+            count = IngestJob.objects.filter(status='running').filter(
+                Q(started_at__lt=limit) | Q(started_at__isnull=True)
+            ).update(status='pending', started_at=None, worker='')
+            if count:
+                self.stdout.write(f"Requeue {count} job macet")
+
+        processed = 0
+        try:
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    if options['once']: break
+                    time.sleep(options['sleep'])
+                    continue
+
+                self.stdout.write(f"[JOB #{job.pk}] {job.novel.title} ...")
+                run_ingest_job(job)
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[JOB #{job.pk}] selesai: {job.chapters_created} chapter dalam {job.duration():.1f}s"
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f"[JOB #{job.pk}] gagal:\n{job.error}"))
+
+                processed += 1
+                if options['max_jobs'] and processed >= options['max_jobs']: break
+        except KeyboardInterrupt:
+            self.stdout.write("Worker dihentikan")
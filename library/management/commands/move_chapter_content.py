@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from library.blobstore import blob_store, content_key
+from library.compression import compress
+from library.fields import IN_BLOB_STORE
+from library.models import Chapter
+
+
+class Command(BaseCommand):
+    help = (
+        "Pindahkan isi chapter antara database dan blob store (content-addressed di MEDIA_ROOT), "
+        "per batch. Juga mengisi content_hash/content_length yang masih kosong."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['blob', 'db'], required=True, help="Tujuan penyimpanan.")
+        parser.add_argument('--novel', type=int, action='append', help="Hanya novel ini (boleh diulang).")
+        parser.add_argument('--batch-size', type=int, default=None, help="Chapter per transaksi (default CHAPTER_BATCH_SIZE).")
+        parser.add_argument('--prune', action='store_true', help="Hapus file blob yang tidak dipakai chapter mana pun (jalankan saat tidak ada ingest).")
+
+    def handle(self, *args, **options):
+        self.store = blob_store()
+        batch_size = options['batch_size'] or getattr(settings, 'CHAPTER_BATCH_SIZE', 500)
+        chapters = Chapter.objects.all()
+        if options['novel']: chapters = chapters.filter(novel_id__in=options['novel'])
+
+        if options['to'] == 'blob':
+            # Semua yang masih di kolom DB
+            todo = chapters.filter(content__isnull=False)
+            move = self.to_blob
+        else:
+            # Yang ada di blob store + baris lama yang belum punya hash
+            todo = chapters.filter(Q(content__isnull=True) | Q(content_hash=''))
+            move = self.to_db
+
+        self.stats = {'moved': 0, 'new_blobs': 0, 'chars': 0}
+        last_id = 0
+        while True:
+            batch = list(
+                todo.filter(id__gt=last_id).select_related('novel').order_by('id')
+                .only('id', 'content', 'content_hash', 'content_length', 'novel__content_dictionary')[:batch_size]
+            )
+            if not batch: break
+            last_id = batch[-1].pk
+            with transaction.atomic():
+                Chapter.objects.bulk_update([move(chap) for chap in batch], ['content', 'content_hash', 'content_length'])
+            self.stats['moved'] += len(batch)
+            self.stdout.write(f"... {self.stats['moved']} chapter")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.stats['moved']} chapter dipindah ke {options['to']} "
+            f"({self.stats['chars'] / 1024:.0f} KB teks, {self.stats['new_blobs']} blob baru)"
+        ))
+
+        if options['prune']:
+            self.prune()
+
+    def to_blob(self, chapter):
+        text = chapter.content
+        key, created = self.store.put(text)
+        self.stats['new_blobs'] += created
+        self.stats['chars'] += len(text)
+        chapter.content, chapter.content_hash, chapter.content_length = IN_BLOB_STORE, key, len(text)
+        return chapter
+
+    def to_db(self, chapter):
+        text = chapter.content  # dibaca dari blob kalau kolomnya NULL
+        self.stats['chars'] += len(text)
+        chapter.content_hash, chapter.content_length = content_key(text), len(text)
+        chapter.content = compress(text, chapter.novel.content_dictionary_id)
+        return chapter
+
+    def prune(self):
+        used = set(
+            Chapter.objects.filter(content__isnull=True).values_list('content_hash', flat=True).iterator()
+        )
+        removed = sum(self.store.delete(key) for key in list(self.store.keys()) if key not in used)
+        self.stdout.write(f"{removed} blob yatim dihapus")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from library.facets import rebuild_facets
+from library.models import FacetCount
+
+
+class Command(BaseCommand):
+    help = "Hitung ulang tabel FacetCount (jumlah novel per genre/status/tag) dan facet_state tiap novel."
+
+    def handle(self, *args, **options):
+        novels = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f"{novels} novel, {FacetCount.objects.count()} baris facet"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasang ulang index full-text novel (FTS5 + trigger di SQLite, GIN tsvector di PostgreSQL) "
+        "lalu isi ulang dari tabel novel."
+    )
+
+    def handle(self, *args, **options):
+        backend = install_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Index pencarian siap (backend: {backend})"))
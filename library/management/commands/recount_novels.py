@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from library.counters import refresh_chapter_stats, refresh_genre_labels, refresh_vote_stats
+from library.models import Novel
+
+
+class Command(BaseCommand):
+    help = (
+        "Hitung ulang counter denormalisasi Novel (chapter_count, latest_chapter_*, "
+        "vote_count, vote_sum, rating_score, label genre) dari tabel Chapter, NovelVote dan relasi genre."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--novel', type=int, action='append', help="Hanya novel ini (boleh diulang).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Novel per UPDATE.")
+
+    def handle(self, *args, **options):
+        novels = Novel.objects.order_by('id')
+        if options['novel']: novels = novels.filter(pk__in=options['novel'])
+        ids = list(novels.values_list('id', flat=True))
+        drift = self.snapshot(ids)
+
+        size = options['batch_size']
+        for i in range(0, len(ids), size):
+            batch = Novel.objects.filter(pk__in=ids[i:i + size])
+            with transaction.atomic():
+                refresh_chapter_stats(batch)
+                refresh_vote_stats(batch)
+                refresh_genre_labels(ids[i:i + size])
+
+        fixed = sum(1 for pk, row in self.snapshot(ids).items() if drift.get(pk) != row)
+        self.stdout.write(self.style.SUCCESS(f"{len(ids)} novel dihitung ulang, {fixed} diperbaiki"))
+
+    def snapshot(self, ids):
+        fields = ('chapter_count', 'latest_chapter_id', 'latest_chapter_index', 'latest_chapter_title', 'vote_count', 'vote_sum', 'rating_score', 'genre')
+        return {row[0]: row[1:] for row in Novel.objects.filter(pk__in=ids).values_list('id', *fields).iterator()}
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from library.feeds import build_home_snapshot, snapshot_timeout
+
+
+class Command(BaseCommand):
+    help = (
+        "Bangun ulang snapshot home feed (hot/latest/completed) di cache. "
+        "Jadwalkan lebih sering dari HOME_SNAPSHOT_TIMEOUT supaya pembaca tidak pernah kena cache miss."
+    )
+
+    def handle(self, *args, **options):
+        snapshot = build_home_snapshot()
+        counts = ', '.join(f"{name} {len(snapshot[name])}" for name in ('hot', 'latest', 'completed'))
+        self.stdout.write(self.style.SUCCESS(f"Snapshot home diperbarui ({counts}), berlaku {snapshot_timeout()} detik"))
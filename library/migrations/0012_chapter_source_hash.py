@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:25
+
+import django.db.models.deletion
+import library.fields
+from django.db import migrations, models
+
+# Salin teks lama apa adanya (UTF-8 polos) ke kolom biner. Kompresi dengan
+# dictionary dilakukan terpisah lewat `manage.py compress_chapters`, per batch.
+COPY_SQL = {
+    'sqlite': 'UPDATE {table} SET {new} = CAST({old} AS BLOB)',
+    'postgresql': "UPDATE {table} SET {new} = convert_to({old}, 'UTF8')",
+    'mysql': 'UPDATE {table} SET {new} = CAST({old} AS BINARY)',
+}
+
+
+def copy_content(apps, schema_editor):
+    Chapter = apps.get_model('library', 'Chapter')
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    sql = COPY_SQL.get(connection.vendor)
+    if sql:
+        schema_editor.execute(sql.format(table=quote(Chapter._meta.db_table), new=quote('content_z'), old=quote('content')))
+        return
+
+    batch = []
+    for chapter in Chapter.objects.only('id', 'content').iterator(chunk_size=500):
+        chapter.content_z = chapter.content.encode('utf-8')
+        batch.append(chapter)
+        if len(batch) == 500:
+            Chapter.objects.bulk_update(batch, ['content_z'])
+            batch = []
+    Chapter.objects.bulk_update(batch, ['content_z'])
+
+
+def restore_content(apps, schema_editor):
+    Chapter = apps.get_model('library', 'Chapter')
+    batch = []
+    for chapter in Chapter.objects.only('id', 'content_z').iterator(chunk_size=500):
+        chapter.content = chapter.content_z or ''
+        batch.append(chapter)
+        if len(batch) == 500:
+            Chapter.objects.bulk_update(batch, ['content'])
+            batch = []
+    Chapter.objects.bulk_update(batch, ['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0012_chapter_source_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentDictionary',
+            fields=[
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('sample_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_dictionaries', to='library.novel')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='content_dictionary',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='library.contentdictionary'),
+        ),
+        migrations.AddField(
+            model_name='chapter',
+            name='content_z',
+            field=library.fields.CompressedContentField(null=True),
+        ),
+        # Kolom lama dibuat nullable dulu supaya migrasi bisa di-reverse
+        migrations.AlterField(
+            model_name='chapter',
+            name='content',
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(copy_content, restore_content),
+        migrations.RemoveField(
+            model_name='chapter',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='chapter',
+            old_name='content_z',
+            new_name='content',
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='content',
+            field=library.fields.CompressedContentField(),
+        ),
+    ]
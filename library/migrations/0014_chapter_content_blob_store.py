@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:28
+
+import library.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_chapter_content_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='chapter',
+            name='content_length',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='chapter',
+            name='content',
+            field=library.fields.CompressedContentField(hash_field='content_hash', length_field='content_length', null=True),
+        ),
+    ]
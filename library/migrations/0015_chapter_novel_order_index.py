@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_chapter_content_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chapter',
+            index=models.Index(fields=['novel', 'order', 'id'], name='chapter_novel_order_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:34
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+
+# Isi awal counter (sama dengan library/counters.py, ditulis ulang di sini
+# karena migrasi harus memakai model historis)
+def fill_counters(apps, schema_editor):
+    Novel = apps.get_model('library', 'Novel')
+    Chapter = apps.get_model('library', 'Chapter')
+    NovelVote = apps.get_model('library', 'NovelVote')
+
+    chapters = Chapter.objects.filter(novel=OuterRef('pk')).order_by()
+    latest = chapters.order_by('-order', '-id')
+    votes = NovelVote.objects.filter(novel=OuterRef('pk')).order_by().values('novel')
+    Novel.objects.update(
+        chapter_count=Coalesce(Subquery(chapters.values('novel').annotate(n=Count('id')).values('n')), 0),
+        latest_chapter_id=Subquery(latest.values('id')[:1]),
+        latest_chapter_index=Subquery(latest.values('chapter_index')[:1]),
+        latest_chapter_title=Coalesce(Subquery(latest.values('title')[:1]), Value('')),
+        vote_count=Coalesce(Subquery(votes.annotate(n=Count('id')).values('n')), 0),
+        vote_sum=Coalesce(Subquery(votes.annotate(s=Sum('score')).values('s')), 0),
+    )
+    Novel.objects.update(rating_score=Coalesce(
+        Round(Cast('vote_sum', FloatField()) / NullIf('vote_count', 0), 1), Value(0.0)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0015_chapter_novel_order_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='novel',
+            name='chapter_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter_index',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='latest_chapter_title',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='vote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='vote_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0016_novel_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(unique=True)),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('novel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='library.novel')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NovelViewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_buckets', to='library.novel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='viewbucket_hour_idx')],
+                'unique_together': {('novel', 'hour')},
+            },
+        ),
+    ]
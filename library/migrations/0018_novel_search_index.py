@@ -0,0 +1,26 @@
+from django.db import OperationalError, migrations
+
+from library.search import drop_search_index, install_search_index
+
+
+def install(apps, schema_editor):
+    try:
+        install_search_index('novel')
+    except OperationalError as e:
+        # SQLite tanpa modul FTS5: pencarian memakai icontains
+        print(f"[SEARCH] index full-text tidak dibuat: {e}")
+
+
+def uninstall(apps, schema_editor):
+    drop_search_index('novel')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0017_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+from library.search import drop_search_index, install_search_index
+
+
+# Tabel FTS isi chapter; datanya diisi saat ingest atau lewat
+# `manage.py index_chapter_text` untuk chapter yang sudah ada
+def install(apps, schema_editor):
+    try:
+        install_search_index('chapter')
+    except OperationalError as e:
+        print(f"[SEARCH] index full-text chapter tidak dibuat: {e}")
+
+
+def uninstall(apps, schema_editor):
+    drop_search_index('chapter')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0018_novel_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterText',
+            fields=[
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_text', serialize=False, to='library.chapter')),
+                ('text', models.TextField()),
+                ('novel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='library.novel')),
+            ],
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0019_chapter_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='novel',
+            index=models.Index(fields=['uploaded_at', 'id'], name='novel_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='novel',
+            index=models.Index(fields=['updated_at', 'id'], name='novel_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='novel',
+            index=models.Index(fields=['views', 'id'], name='novel_views_idx'),
+        ),
+    ]
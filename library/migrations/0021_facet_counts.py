@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:47
+
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+
+from library.search import install_search_index
+
+
+# Isi awal cube facet (sama dengan library.facets.rebuild_facets, memakai model historis)
+def fill_facets(apps, schema_editor):
+    Novel = apps.get_model('library', 'Novel')
+    FacetCount = apps.get_model('library', 'FacetCount')
+    tags = {}
+    for novel_id, tag_id in Novel.tags.through.objects.values_list('novel_id', 'tag_id').iterator():
+        tags.setdefault(novel_id, []).append(tag_id)
+
+    counts, states = Counter(), []
+    for novel_id, genre, status in Novel.objects.values_list('id', 'genre', 'status').iterator():
+        state = {'genre': genre, 'status': status, 'tags': sorted(tags.get(novel_id, []))}
+        counts[(genre, status, 0)] += 1
+        for tag_id in state['tags']:
+            counts[(genre, status, tag_id)] += 1
+        states.append(Novel(pk=novel_id, facet_state=state))
+
+    FacetCount.objects.bulk_create(FacetCount(genre=g, status=s, tag_id=t, count=n) for (g, s, t), n in counts.items())
+    Novel.objects.bulk_update(states, ['facet_state'], batch_size=500)
+
+
+# Rollback RemoveField membangun ulang tabel novel di SQLite (trigger FTS ikut
+# hilang); operasi ini dijalankan paling akhir saat rollback untuk memasangnya lagi
+def reinstall_search_index(apps, schema_editor):
+    try:
+        install_search_index('novel')
+    except OperationalError:
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0020_novel_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.AddField(
+            model_name='novel',
+            name='facet_state',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('tag_id', models.PositiveIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag_id', 'status'], name='facet_tag_status_idx')],
+                'unique_together': {('genre', 'status', 'tag_id')},
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
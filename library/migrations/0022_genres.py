@@ -0,0 +1,127 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:51
+
+from collections import Counter
+from itertools import product
+
+from django.db import OperationalError, migrations, models
+
+from library.models import genre_slug, split_genres
+from library.search import install_search_index
+
+
+# Pecah string genre lama ("Action, Fantasy") ke tabel Genre + relasi M2M,
+# lalu isi ulang cube facet per genre_id (sama dengan library.facets.rebuild_facets)
+def fill_genres(apps, schema_editor):
+    Novel = apps.get_model('library', 'Novel')
+    Genre = apps.get_model('library', 'Genre')
+    FacetCount = apps.get_model('library', 'FacetCount')
+
+    novels = {novel_id: split_genres(value) for novel_id, value in Novel.objects.values_list('id', 'genre').iterator()}
+    names = {}
+    for genre_names in novels.values():
+        for name in genre_names: names.setdefault(genre_slug(name), name)
+    Genre.objects.bulk_create([Genre(name=name, slug=slug) for slug, name in names.items()], ignore_conflicts=True)
+    genre_ids = dict(Genre.objects.values_list('slug', 'id'))
+    labels = dict(Genre.objects.values_list('id', 'name'))
+
+    tags = {}
+    for novel_id, tag_id in Novel.tags.through.objects.values_list('novel_id', 'tag_id').iterator():
+        tags.setdefault(novel_id, []).append(tag_id)
+
+    links, counts, states = [], Counter(), []
+    statuses = dict(Novel.objects.values_list('id', 'status'))
+    for novel_id, genre_names in novels.items():
+        ids = sorted({genre_ids[genre_slug(name)] for name in genre_names})
+        links.extend(Novel.genres.through(novel_id=novel_id, genre_id=genre_id) for genre_id in ids)
+        state = {'genres': ids, 'status': statuses[novel_id], 'tags': sorted(tags.get(novel_id, []))}
+        counts.update((g, state['status'], t) for g, t in product([0, *ids], [0, *state['tags']]))
+        # Label sama dengan library.counters.refresh_genre_labels (nama Genre, urut abjad)
+        label = ", ".join(sorted(labels[genre_id] for genre_id in ids))[:100]
+        states.append(Novel(pk=novel_id, genre=label, facet_state=state))
+
+    Novel.genres.through.objects.bulk_create(links, batch_size=500, ignore_conflicts=True)
+    FacetCount.objects.bulk_create(FacetCount(genre_id=g, status=s, tag_id=t, count=n) for (g, s, t), n in counts.items())
+    Novel.objects.bulk_update(states, ['genre', 'facet_state'], batch_size=500)
+
+
+def clear_facets(apps, schema_editor):
+    apps.get_model('library', 'FacetCount').objects.all().delete()
+
+
+# Rollback: cube kembali per string genre (isi 0021_facet_counts)
+def fill_string_facets(apps, schema_editor):
+    Novel = apps.get_model('library', 'Novel')
+    FacetCount = apps.get_model('library', 'FacetCount')
+    tags = {}
+    for novel_id, tag_id in Novel.tags.through.objects.values_list('novel_id', 'tag_id').iterator():
+        tags.setdefault(novel_id, []).append(tag_id)
+
+    counts, states = Counter(), []
+    for novel_id, genre, status in Novel.objects.values_list('id', 'genre', 'status').iterator():
+        state = {'genre': genre, 'status': status, 'tags': sorted(tags.get(novel_id, []))}
+        counts.update((genre, status, t) for t in [0, *state['tags']])
+        states.append(Novel(pk=novel_id, facet_state=state))
+
+    FacetCount.objects.bulk_create(FacetCount(genre=g, status=s, tag_id=t, count=n) for (g, s, t), n in counts.items())
+    Novel.objects.bulk_update(states, ['facet_state'], batch_size=500)
+
+
+# AlterField genre membangun ulang tabel novel di SQLite (trigger FTS ikut
+# hilang), baik saat migrate maupun rollback; pasang lagi di kedua arah
+def reinstall_search_index(apps, schema_editor):
+    try:
+        install_search_index('novel')
+    except OperationalError:
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0021_facet_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.RunPython(clear_facets, fill_string_facets),
+        migrations.AlterUniqueTogether(
+            name='facetcount',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='facetcount',
+            name='genre',
+        ),
+        migrations.AddField(
+            model_name='facetcount',
+            name='genre_id',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterUniqueTogether(
+            name='facetcount',
+            unique_together={('genre_id', 'status', 'tag_id')},
+        ),
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(allow_unicode=True, max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='novel',
+            name='genres',
+            field=models.ManyToManyField(blank=True, related_name='novels', to='library.genre'),
+        ),
+        migrations.AlterField(
+            model_name='novel',
+            name='genre',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_genres, clear_facets),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,12 @@
+import hashlib
 from django.db import models
-from django.db.models import Avg
 from django.contrib.auth.models import User
 from django.core.files import File
+from django.utils import timezone
+from django.utils.text import slugify
 from PIL import Image
+from .compression import MAX_TRAINING_SAMPLES, train_dictionary
+from .fields import CompressedContentField
 from io import BytesIO
 import os
 
@@ -18,6 +22,50 @@ class Tag(models.Model):
         return self.name
 
 
+# =========================
+# GENRE
+# =========================
+def genre_slug(name):
+    """Slug genre. Nama non-Latin tetap punya slug ("玄幻"); yang tanpa huruf sama sekali pakai hash."""
+    name = name.strip()
+    slug = slugify(name, allow_unicode=True)[:100]
+    return slug or f"genre-{hashlib.md5(name.lower().encode()).hexdigest()[:12]}"
+
+
+def split_genres(value):
+    """"Action, Fantasy" -> ["Action", "Fantasy"] (tanpa duplikat, urutan tetap)."""
+    names = {}
+    for name in str(value or '').split(','):
+        name = name.strip()[:100]
+        if name: names.setdefault(genre_slug(name), name)
+    return list(names.values())
+
+
+class Genre(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=100, unique=True, allow_unicode=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def for_names(cls, names):
+        """Genre untuk tiap nama (dibuat kalau belum ada), dicocokkan lewat slug atau nama."""
+        wanted = {genre_slug(name): name for name in split_genres(",".join(names))}
+        if not wanted: return []
+        cls.objects.bulk_create(
+            [cls(name=name, slug=slug) for slug, name in wanted.items()], ignore_conflicts=True
+        )
+        # Genre dari admin bisa punya slug sendiri: yang bentrok di nama dicari lewat nama
+        found = list(cls.objects.filter(models.Q(slug__in=wanted) | models.Q(name__in=wanted.values())))
+        by_slug, by_name = {g.slug: g for g in found}, {g.name: g for g in found}
+        genres = [by_slug.get(slug) or by_name.get(name) for slug, name in wanted.items()]
+        return [genre for genre in genres if genre is not None]
+
+
 # =========================
 # NOVEL
 # =========================
@@ -31,18 +79,44 @@ class Novel(models.Model):
     author = models.CharField(max_length=255, blank=True, default="Unknown")
     alternative_title = models.CharField(max_length=500, blank=True, null=True)
     synopsis = models.TextField(blank=True, null=True)
-    genre = models.CharField(max_length=100, default="Action")
+    genres = models.ManyToManyField(Genre, blank=True, related_name='novels')
+    # Label tampilan ("Action, Fantasy") dari `genres`, dirawat signal m2m;
+    # filter & facet selalu lewat tabel relasi genre
+    genre = models.CharField(max_length=100, blank=True, default='', editable=False)
     tags = models.ManyToManyField(Tag, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Ongoing')
     cover = models.ImageField(upload_to='covers/', null=True, blank=True)
 
     views = models.IntegerField(default=0)
+    # Counter yang dirawat library/counters.py (jangan di-set manual,
+    # perbaiki dengan `manage.py recount_novels`)
     rating_score = models.FloatField(default=0.0)
+    vote_count = models.PositiveIntegerField(default=0)
+    vote_sum = models.IntegerField(default=0)
+    chapter_count = models.PositiveIntegerField(default=0)
+    latest_chapter_id = models.PositiveIntegerField(null=True, blank=True)
+    latest_chapter_index = models.FloatField(null=True, blank=True)
+    latest_chapter_title = models.CharField(max_length=255, blank=True, default='')
 
     epub_file = models.FileField(upload_to='epubs/', null=True, blank=True)
+    # Dictionary zstd aktif untuk konten chapter (lihat ContentDictionary)
+    content_dictionary = models.ForeignKey(
+        'ContentDictionary', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    # Kontribusi terakhir novel ini ke FacetCount ({genres, status, tags}),
+    # dirawat library/facets.py
+    facet_state = models.JSONField(null=True, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Cursor pagination katalog (terbaru / baru diupdate / populer)
+            models.Index(fields=['uploaded_at', 'id'], name='novel_uploaded_idx'),
+            models.Index(fields=['updated_at', 'id'], name='novel_updated_idx'),
+            models.Index(fields=['views', 'id'], name='novel_views_idx'),
+        ]
+
     # =========================
     # SAVE OVERRIDE (SATU-SATUNYA)
     # =========================
@@ -109,8 +183,13 @@ class Novel(models.Model):
             print(f"[WEBP ERROR] {e}")
 
     def average_rating(self):
-        avg = self.votes.aggregate(Avg('score'))['score__avg']
-        return round(avg, 1) if avg else 0.0
+        # Dirawat counter (vote_sum / vote_count), tanpa query
+        return self.rating_score
+
+    def set_genres(self, names):
+        """Ganti genre novel dari daftar nama (atau string "A, B" dari metadata EPUB)."""
+        if isinstance(names, str): names = split_genres(names)
+        self.genres.set(Genre.for_names(names))
 
     def __str__(self):
         return self.title
@@ -122,18 +201,173 @@ class Novel(models.Model):
 class Chapter(models.Model):
     novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='chapters')
     title = models.CharField(max_length=255)
-    content = models.TextField()
+    # Disimpan terkompresi zstd (atau di blob store, lihat CHAPTER_CONTENT_STORAGE),
+    # dibaca sebagai str biasa
+    content = CompressedContentField(null=True, hash_field='content_hash', length_field='content_length')
     order = models.FloatField(default=0.0)
     chapter_index = models.FloatField(default=0)
+    # Hash dokumen sumber (EPUB/TXT) untuk re-ingest incremental
+    source_hash = models.CharField(max_length=64, blank=True, default='')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Diisi CompressedContentField saat content disimpan (harus setelah `content`)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    content_length = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ['order']
+        indexes = [
+            # Navigasi, bundle & daftar chapter: range scan per novel sesuai urutan baca
+            models.Index(fields=['novel', 'order', 'id'], name='chapter_novel_order_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'content_hash', 'content_length'}
+        super().save(*args, **kwargs)
+
+    def get_content_dictionary(self):
+        # Dipakai CompressedContentField saat save()/bulk_create()
+        return self.novel.content_dictionary_id
 
     def __str__(self):
         return f"{self.novel.title} - {self.title}"
 
 
+# =========================
+# TEKS POLOS CHAPTER (PENCARIAN ISI)
+# =========================
+class ChapterText(models.Model):
+    # Isi chapter tanpa tag HTML, ditulis saat ingest; di-index full-text
+    # per novel oleh library/search.py
+    chapter = models.OneToOneField(Chapter, on_delete=models.CASCADE, primary_key=True, related_name='search_text')
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='+')
+    text = models.TextField()
+
+    def __str__(self):
+        return f"Teks #{self.chapter_id} ({len(self.text)} karakter)"
+
+
+# =========================
+# DICTIONARY KOMPRESI CHAPTER
+# =========================
+class ContentDictionary(models.Model):
+    # Primary key = dict_id di header frame zstd, jadi dekompresi langsung
+    # tahu dictionary mana yang dipakai tanpa join ke novel
+    id = models.PositiveIntegerField(primary_key=True)
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='content_dictionaries')
+    data = models.BinaryField()
+    sample_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @classmethod
+    def train_for(cls, novel, samples):
+        """Latih dictionary baru dari isi chapter dan jadikan aktif untuk novel. Return None kalau gagal."""
+        trained = train_dictionary(samples)
+        if trained is None: return None
+        dict_id, data = trained
+        dictionary = cls.objects.create(id=dict_id, novel=novel, data=data, sample_count=min(len(samples), MAX_TRAINING_SAMPLES))
+        novel.content_dictionary = dictionary
+        Novel.objects.filter(pk=novel.pk).update(content_dictionary=dictionary)
+        return dictionary
+
+    def __str__(self):
+        return f"zstd #{self.pk} - {self.novel.title} ({len(self.data) // 1024} KB)"
+
+
+# =========================
+# INGEST JOB (ANTRIAN EPUB)
+# =========================
+class IngestJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='ingest_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    chapters_created = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def progress_key(self):
+        # Progress ditulis ke cache karena ingest berjalan dalam satu
+        # transaksi (update ke row job baru terlihat setelah commit)
+        return f"ingest-job:{self.pk}:progress"
+
+    def duration(self):
+        if not self.started_at: return None
+        end = self.finished_at or timezone.now()
+        return (end - self.started_at).total_seconds()
+
+    def __str__(self):
+        return f"Ingest #{self.pk} - {self.novel.title} ({self.status})"
+
+
+# =========================
+# TRENDING
+# =========================
+class NovelViewBucket(models.Model):
+    # Jumlah view per novel per jam (ditulis saat buffer views di-flush)
+    novel = models.ForeignKey(Novel, on_delete=models.CASCADE, related_name='view_buckets')
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('novel', 'hour')
+        indexes = [models.Index(fields=['hour'], name='viewbucket_hour_idx')]
+
+    def __str__(self):
+        return f"{self.novel_id} @ {self.hour:%Y-%m-%d %H}:00 = {self.views}"
+
+
+class TrendingRank(models.Model):
+    # Hasil `manage.py compute_trending`; hot list cukup membaca rank 1..N
+    rank = models.PositiveIntegerField(unique=True)
+    novel = models.OneToOneField(Novel, on_delete=models.CASCADE, related_name='trending')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.novel.title} ({self.score:.1f})"
+
+
+# =========================
+# FACET (GENRE / STATUS / TAG)
+# =========================
+class FacetCount(models.Model):
+    # Jumlah novel per kombinasi (genre, status, tag). genre_id / tag_id = 0
+    # berarti "semua" pada dimensi itu: novel dengan banyak genre & tag masuk
+    # ke tiap kombinasi, jadi total tanpa filter genre diambil dari baris
+    # genre_id = 0 (bukan dijumlah per genre). Dirawat library/facets.py.
+    genre_id = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20)
+    tag_id = models.PositiveIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('genre_id', 'status', 'tag_id')
+        indexes = [models.Index(fields=['tag_id', 'status'], name='facet_tag_status_idx')]
+
+    def __str__(self):
+        return f"{self.genre_id}/{self.status}/{self.tag_id}: {self.count}"
+
+
 # =========================
 # VOTE
 # =========================
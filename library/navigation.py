@@ -0,0 +1,75 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+
+from .models import Chapter
+
+# =====================================================
+# INDEX URUTAN CHAPTER PER NOVEL
+# =====================================================
+# Dua array paralel (order, id) yang diurutkan seperti daftar chapter. Next/
+# prev cukup dicari dengan bisect di memori, tanpa query tambahan. Index
+# disimpan di cache dan dihapus lewat signals.chapters_changed(). Cache
+# default (LocMem) per proses, jadi hapus dari proses lain (ingest_worker,
+# admin) tidak sampai ke sini: index juga dicap Novel.updated_at saat dibangun
+# dan dianggap basi kalau novel sudah berubah setelahnya (chapters_changed
+# selalu menaikkan updated_at).
+
+INDEX_TIMEOUT = 60 * 60 * 24
+
+
+def index_key(novel_id):
+    return f"chapter-index:{novel_id}"
+
+
+def build_chapter_index(novel):
+    orders, ids = array('d'), array('q')
+    for order, pk in Chapter.objects.filter(novel_id=novel.pk).order_by('order', 'id').values_list('order', 'id'):
+        orders.append(order)
+        ids.append(pk)
+    # updated_at dibaca sebelum chapter, jadi cap ini tidak pernah lebih baru dari isinya
+    cache.set(index_key(novel.pk), (novel.updated_at, orders, ids), INDEX_TIMEOUT)
+    return orders, ids
+
+
+def chapter_index(novel):
+    """(orders, ids) untuk satu novel, dari cache kalau masih sesuai novel.updated_at."""
+    cached = cache.get(index_key(novel.pk))
+    if cached is None or cached[0] < novel.updated_at: return build_chapter_index(novel)
+    return cached[1:]
+
+
+def invalidate_chapter_index(novel_id):
+    cache.delete(index_key(novel_id))
+
+
+def _neighbours(index, chapter):
+    orders, ids = index
+    lo, hi = bisect_left(orders, chapter.order), bisect_right(orders, chapter.order)
+    if chapter.pk not in ids[lo:hi]: return None
+    prev_id = ids[lo - 1] if lo > 0 else None
+    next_id = ids[hi] if hi < len(ids) else None
+    return prev_id, next_id
+
+
+def chapter_neighbours_many(chapters):
+    """
+    (prev_id, next_id) untuk tiap chapter (semua dari novel yang sama):
+    chapter terakhir dengan order lebih kecil dan chapter pertama dengan
+    order lebih besar (sama seperti query order__lt / order__gt sebelumnya).
+    """
+    if not chapters: return []
+    # View memakai select_related('novel'), jadi updated_at tanpa query tambahan
+    novel = chapters[0].novel
+    index = chapter_index(novel)
+    result = [_neighbours(index, chapter) for chapter in chapters]
+    if None in result:
+        # Index basi (mis. perubahan yang belum sempat meng-invalidate): bangun ulang
+        index = build_chapter_index(novel)
+        result = [_neighbours(index, chapter) or (None, None) for chapter in chapters]
+    return result
+
+
+def chapter_neighbours(chapter):
+    return chapter_neighbours_many([chapter])[0]
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+# =====================================================
+# PAGINATION
+# =====================================================
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    CursorPagination DRF hanya memakai field urutan pertama sebagai posisi;
+    kalau nilainya kembar (views 0, updated_at hasil touch massal, skor
+    relevansi sama) DRF jatuh ke OFFSET yang makin mahal tiap halaman. Di sini
+    posisi berisi nilai semua field urutan (yang terakhir unik, mis. id) dan
+    difilter sebagai tuple: (a < x) OR (a = x AND id < y).
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size: return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor.position if self.cursor else None
+
+        ordering = self.ordering
+        if reverse: ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, self.decode_position(position, queryset)))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            # Query dibalik untuk halaman sebelumnya, kembalikan ke urutan asli
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, ordering, values):
+        match = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            ties = {prev.lstrip('-'): value for prev, value in zip(ordering[:i], values)}
+            match |= Q(**ties, **{f'{name}__{lookup}': values[i]})
+        return match
+
+    def get_next_link(self):
+        if not self.has_next or not self.page: return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.encode_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page: return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.encode_position(self.page[0])))
+
+    def encode_position(self, instance):
+        values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        return json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+
+    def decode_position(self, position, queryset):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursor dari luar: tiap nilai dikonversi lewat field-nya (atau output_field
+        # anotasi, mis. search_rank) supaya cursor rusak jadi 404, bukan 500
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [self.position_field(queryset, field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def position_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+class ChapterCursorPagination(KeysetCursorPagination):
+    """
+    Daftar isi chapter per novel. Cursor (bukan nomor halaman) supaya halaman
+    ke-30 dari novel ribuan chapter sama murahnya dengan halaman pertama.
+    """
+    ordering = ('order', 'id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class NovelCursorPagination(KeysetCursorPagination):
+    """
+    Katalog novel (list, tag, search). Cursor menyimpan posisi terakhir, jadi
+    halaman dalam sama murahnya dengan halaman pertama (tanpa OFFSET besar).
+    COUNT(*) hanya dijalankan kalau diminta lewat `?count=1`.
+    """
+    ordering = ('-uploaded_at', '-id')
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 60
+
+    def __init__(self, ordering=None):
+        if ordering: self.ordering = ordering
+        self.count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('count') in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        body = {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+        if self.count is not None: body['count'] = self.count
+        return Response(body)
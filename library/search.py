@@ -0,0 +1,300 @@
+import re
+from html import escape
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .cleaning import plain_text
+from .models import ChapterText
+
+# =====================================================
+# FULL-TEXT SEARCH
+# =====================================================
+# Dua index dengan API yang sama di semua backend:
+#   - 'novel'  : title, alternative_title, author, synopsis -> search_novels()
+#   - 'chapter': teks polos isi chapter (ChapterText) per novel -> search_chapters()
+# SQLite memakai tabel FTS5 external-content yang disinkronkan trigger di
+# tabel sumbernya (jadi ikut save(), .update() maupun delete). PostgreSQL
+# memakai index GIN di atas ekspresi tsvector. Backend lain / SQLite tanpa
+# FTS5 jatuh ke icontains. Index dibuat oleh migrasi (0018 novel, 0019
+# chapter). Migrasi yang membangun ulang tabel sumber di SQLite ikut
+# menghapus trigger-nya: jalankan `manage.py rebuild_search_index` setelahnya.
+
+FTS_TABLE = 'library_novel_fts'
+CHAPTER_FTS_TABLE = 'library_chapter_fts'
+# Bobot bm25 per kolom index novel (title, alternative_title, author, synopsis)
+FTS_WEIGHTS = (10.0, 8.0, 4.0, 1.0)
+# Penanda highlight sementara (di-escape dulu baru diganti <mark>)
+MARK_START, MARK_END = '\x02', '\x03'
+
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(alternative_title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(synopsis, '')), 'C')"
+)
+PG_CHAPTER_DOCUMENT = "to_tsvector('simple', text)"
+
+
+def _fts5_triggers(fts, table, key, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    changed = ' OR '.join(f'old.{c} IS NOT new.{c}' for c in columns)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.{key}, {new});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{key}, {old});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table}
+        WHEN {changed}
+        BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.{key}, {old});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.{key}, {new});
+        END""",
+    ]
+
+
+SEARCH_INDEXES = {
+    'novel': {
+        'fts': FTS_TABLE,
+        'sqlite': [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, alternative_title, author, synopsis,
+                content='library_novel', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )""",
+            *_fts5_triggers(FTS_TABLE, 'library_novel', 'id', ('title', 'alternative_title', 'author', 'synopsis')),
+        ],
+        'pg_index': 'library_novel_search_idx',
+        'postgresql': f"CREATE INDEX IF NOT EXISTS library_novel_search_idx ON library_novel USING GIN (({PG_DOCUMENT}))",
+    },
+    'chapter': {
+        'fts': CHAPTER_FTS_TABLE,
+        # novel_id ikut di-index (sebagai token angka) supaya filter per novel
+        # terjadi di dalam MATCH, bukan menyaring hasil semua novel
+        'sqlite': [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {CHAPTER_FTS_TABLE} USING fts5(
+                text, novel_id,
+                content='library_chaptertext', content_rowid='chapter_id',
+                tokenize='unicode61 remove_diacritics 2'
+            )""",
+            *_fts5_triggers(CHAPTER_FTS_TABLE, 'library_chaptertext', 'chapter_id', ('text', 'novel_id')),
+        ],
+        'pg_index': 'library_chaptertext_search_idx',
+        'postgresql': (
+            "CREATE INDEX IF NOT EXISTS library_chaptertext_search_idx "
+            f"ON library_chaptertext USING GIN (({PG_CHAPTER_DOCUMENT}))"
+        ),
+    },
+}
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def search_backend(index='novel'):
+    if connection.vendor == 'postgresql': return 'postgresql'
+    if connection.vendor == 'sqlite' and fts_table_exists(SEARCH_INDEXES[index]['fts']): return 'fts5'
+    return 'basic'
+
+
+def fts_table_exists(table=FTS_TABLE):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+        return cursor.fetchone() is not None
+
+
+def drop_search_index(*names):
+    with connection.cursor() as cursor:
+        for name in names or SEARCH_INDEXES:
+            spec = SEARCH_INDEXES[name]
+            if connection.vendor == 'sqlite':
+                for suffix in ('ai', 'ad', 'au'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {spec['fts']}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {spec['fts']}")
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f"DROP INDEX IF EXISTS {spec['pg_index']}")
+
+
+def install_search_index(*names):
+    """Buat (kalau belum) index + trigger lalu isi ulang; default semua index. Return nama backend."""
+    with connection.cursor() as cursor:
+        for name in names or SEARCH_INDEXES:
+            spec = SEARCH_INDEXES[name]
+            if connection.vendor == 'sqlite':
+                for sql in spec['sqlite']:
+                    cursor.execute(sql)
+                cursor.execute(f"INSERT INTO {spec['fts']}({spec['fts']}) VALUES ('rebuild')")
+            elif connection.vendor == 'postgresql':
+                cursor.execute(spec['postgresql'])
+    return search_backend()
+
+
+def fts5_match(terms):
+    # Tiap kata jadi prefix ("naga"*), semua kata wajib ada
+    return ' '.join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
+
+def search_novels(queryset, query):
+    """Filter queryset Novel dengan kata kunci, urut relevansi (anotasi `search_rank`)."""
+    terms = search_terms(query)
+    if not terms: return queryset
+
+    backend = search_backend()
+    if backend == 'fts5':
+        match = fts5_match(terms)
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        rowids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        # bm25: makin kecil makin relevan, jadi dibalik supaya urutannya sama dengan PostgreSQL
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = library_novel.id", [match], output_field=FloatField()
+        )
+        return queryset.filter(id__in=rowids).annotate(search_rank=rank).order_by('-search_rank', '-id')
+
+    if backend == 'postgresql':
+        tsquery = ' & '.join(f"{t}:*" for t in terms)
+        return (
+            queryset.annotate(
+                search_hit=RawSQL(f"({PG_DOCUMENT}) @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()),
+                search_rank=RawSQL(f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()),
+            )
+            .filter(search_hit=True)
+            .order_by('-search_rank', '-id')
+        )
+
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(alternative_title__icontains=term)
+            | Q(author__icontains=term) | Q(synopsis__icontains=term)
+        )
+    return queryset
+
+
+# =====================================================
+# PENCARIAN ISI CHAPTER
+# =====================================================
+
+def chapter_text_enabled():
+    return getattr(settings, 'CHAPTER_TEXT_INDEX', True)
+
+
+def index_chapter_texts(rows, batch_size=500):
+    """Tulis/ganti teks polos [(chapter_id, novel_id, html)]; trigger FTS ikut memperbarui index."""
+    if not chapter_text_enabled(): return
+    ChapterText.objects.bulk_create(
+        [ChapterText(chapter_id=pk, novel_id=novel_id, text=plain_text(html)) for pk, novel_id, html in rows],
+        batch_size=batch_size, update_conflicts=True, unique_fields=['chapter'], update_fields=['text', 'novel'],
+    )
+
+
+def highlight(snippet):
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def match_positions(text, terms, limit=20):
+    """Offset karakter (awal, akhir) kata yang cocok di teks polos chapter."""
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(t) for t in terms) + r')\w*', re.IGNORECASE)
+    positions = []
+    for m in pattern.finditer(text):
+        positions.append((m.start(), m.end()))
+        if len(positions) == limit: break
+    return positions
+
+
+def _python_snippet(text, terms, width=120):
+    start = match_positions(text, terms, limit=1)
+    if not start: return escape(text[:width])
+    begin = max(start[0][0] - width // 2, 0)
+    part = text[begin:begin + width]
+    pattern = re.compile(r'\b(?:' + '|'.join(re.escape(t) for t in terms) + r')\w*', re.IGNORECASE)
+    marked = pattern.sub(lambda m: f"{MARK_START}{m.group(0)}{MARK_END}", part)
+    return ('…' if begin else '') + highlight(marked) + ('…' if begin + width < len(text) else '')
+
+
+def _chapter_hits_fts5(novel_id, terms, limit, offset):
+    fts = CHAPTER_FTS_TABLE
+    match = f'novel_id : "{int(novel_id)}" AND text : ({fts5_match(terms)})'
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {fts} WHERE {fts} MATCH %s", [match])
+        count = cursor.fetchone()[0]
+        # `rank` bawaan FTS5 (= bm25) dipakai untuk ORDER BY tanpa menghitung ulang
+        cursor.execute(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s ORDER BY rank LIMIT %s OFFSET %s", [match, limit, offset])
+        ids = [row[0] for row in cursor.fetchall()]
+        snippets = {}
+        if ids:
+            # Snippet hanya untuk satu halaman hasil
+            cursor.execute(
+                f"SELECT rowid, snippet({fts}, 0, %s, %s, '…', 24) FROM {fts} "
+                f"WHERE {fts} MATCH %s AND rowid IN ({', '.join(['%s'] * len(ids))})",
+                [MARK_START, MARK_END, match, *ids],
+            )
+            snippets = {pk: highlight(snippet) for pk, snippet in cursor.fetchall()}
+    return count, [(pk, snippets.get(pk, '')) for pk in ids]
+
+
+def _chapter_hits_postgresql(novel_id, terms, limit, offset):
+    tsquery = ' & '.join(f"{t}:*" for t in terms)
+    hits = ChapterText.objects.filter(novel_id=novel_id).annotate(
+        search_hit=RawSQL(f"{PG_CHAPTER_DOCUMENT} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()),
+    ).filter(search_hit=True)
+    count = hits.count()
+    page = hits.annotate(
+        search_rank=RawSQL(f"ts_rank({PG_CHAPTER_DOCUMENT}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField()),
+    ).order_by('-search_rank', 'chapter_id').values_list('chapter_id', flat=True)[offset:offset + limit]
+    ids = list(page)
+    options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15"
+    snippets = dict(
+        ChapterText.objects.filter(chapter_id__in=ids).annotate(
+            snippet=RawSQL("ts_headline('simple', text, to_tsquery('simple', %s), %s)", [tsquery, options])
+        ).values_list('chapter_id', 'snippet')
+    )
+    return count, [(pk, highlight(snippets.get(pk, ''))) for pk in ids]
+
+
+def _chapter_hits_basic(novel_id, terms, limit, offset):
+    hits = ChapterText.objects.filter(novel_id=novel_id)
+    for term in terms:
+        hits = hits.filter(text__icontains=term)
+    count = hits.count()
+    page = hits.order_by('chapter__order', 'chapter_id').values_list('chapter_id', 'text')[offset:offset + limit]
+    return count, [(pk, _python_snippet(text, terms)) for pk, text in page]
+
+
+def search_chapters(novel_id, query, limit=20, offset=0):
+    """
+    Cari kata di isi chapter satu novel. Return (jumlah_total, hasil) dengan
+    hasil = [{'chapter_id', 'title', 'order', 'chapter_index', 'snippet', 'positions'}]
+    urut relevansi; snippet berupa HTML aman dengan <mark> di kata yang cocok.
+    """
+    terms = search_terms(query)
+    if not terms: return 0, []
+
+    backend = search_backend('chapter')
+    find = {'fts5': _chapter_hits_fts5, 'postgresql': _chapter_hits_postgresql}.get(backend, _chapter_hits_basic)
+    count, hits = find(novel_id, terms, limit, offset)
+
+    rows = {
+        row.chapter_id: row for row in
+        ChapterText.objects.filter(chapter_id__in=[pk for pk, _ in hits])
+        .select_related('chapter').only('chapter_id', 'text', 'chapter__title', 'chapter__order', 'chapter__chapter_index')
+    }
+    results = []
+    for pk, snippet in hits:
+        row = rows.get(pk)
+        if row is None: continue
+        results.append({
+            'chapter_id': pk,
+            'title': row.chapter.title,
+            'order': row.chapter.order,
+            'chapter_index': row.chapter.chapter_index,
+            'snippet': snippet,
+            'positions': match_positions(row.text, terms),
+        })
+    return count, results
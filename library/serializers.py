@@ -1,14 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Novel, Chapter, UserSettings, Comment, Tag, Bookmark
+from django.core.cache import cache
+from .models import Novel, Chapter, UserSettings, Comment, Tag, Genre, Bookmark, IngestJob
 
-# --- 1. Serializer Helper (Tag & Chapter) ---
+# --- 1. Serializer Helper (Tag, Genre & Chapter) ---
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
 
+class GenreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ['id', 'name', 'slug']
+
 class ChapterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chapter
@@ -16,32 +22,53 @@ class ChapterSerializer(serializers.ModelSerializer):
 
 # --- 2. Serializer Utama (List & Detail) ---
 
+class LatestChapterField(serializers.Field):
+    """Chapter terakhir dari kolom latest_chapter_* di Novel (tanpa query)."""
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, novel):
+        if novel.latest_chapter_id is None: return None
+        return {
+            'id': novel.latest_chapter_id,
+            'title': novel.latest_chapter_title,
+            'chapter_index': novel.latest_chapter_index,
+        }
+
 class NovelListSerializer(serializers.ModelSerializer):
-    rating = serializers.FloatField(source='average_rating', read_only=True)
-    chapter_count = serializers.IntegerField(source='chapters.count', read_only=True)
+    # Semua dari kolom counter Novel, jadi list tidak menambah query per baris
+    rating = serializers.FloatField(source='rating_score', read_only=True)
+    latest_chapter = LatestChapterField()
 
     class Meta:
         model = Novel
         fields = [
             'id', 'title', 'cover', 'genre', 'status', 
-            'rating', 'chapter_count', 'uploaded_at','views'
+            'rating', 'vote_count', 'chapter_count', 'latest_chapter', 'uploaded_at','views'
         ]
 
 class NovelDetailSerializer(serializers.ModelSerializer):
     is_bookmarked = serializers.SerializerMethodField()
-    chapters = ChapterSerializer(many=True, read_only=True)
+    # Daftar chapter tidak lagi ikut di sini: ambil lewat /api/novels/<id>/chapters/
     tags = TagSerializer(many=True, read_only=True)
-    rating = serializers.FloatField(source='average_rating', read_only=True)
+    genres = GenreSerializer(many=True, read_only=True)
+    rating = serializers.FloatField(source='rating_score', read_only=True)
+    latest_chapter = LatestChapterField()
 
     class Meta:
         model = Novel
         fields = [
             'id', 'title', 'author', 'synopsis', 'tags', 'cover', 
-            'genre', 'status', 'rating', 'uploaded_at', 
-            'chapters', 'is_bookmarked','views','alternative_title'
+            'genre', 'genres', 'status', 'rating', 'vote_count', 'uploaded_at', 
+            'chapter_count', 'latest_chapter', 'is_bookmarked','views','alternative_title'
         ]
 
     def get_is_bookmarked(self, obj):
+        # View yang sudah menghitungnya (untuk ETag) bisa mengoper lewat context
+        if 'is_bookmarked' in self.context:
+            return self.context['is_bookmarked']
         user = self.context.get('request').user
         if user.is_authenticated:
             # Cek apakah ada bookmark DAN is_in_library = True
@@ -96,4 +123,25 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = ['id', 'username', 'text', 'created_at']
\ No newline at end of file
+        fields = ['id', 'username', 'text', 'created_at']
+
+# --- 5. Antrian Ingest ---
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    novel_title = serializers.CharField(source='novel.title', read_only=True)
+    duration = serializers.FloatField(read_only=True)
+    chapters_processed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IngestJob
+        fields = [
+            'id', 'novel_id', 'novel_title', 'status', 'chapters_created',
+            'chapters_processed', 'error', 'created_at', 'started_at',
+            'finished_at', 'duration'
+        ]
+
+    def get_chapters_processed(self, obj):
+        # Saat running, angka sementara ada di cache (ditulis worker per batch)
+        if obj.status == 'running':
+            return cache.get(obj.progress_key, 0)
+        return obj.chapters_created
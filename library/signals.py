@@ -0,0 +1,240 @@
+import threading
+from contextlib import contextmanager
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .autocomplete import novel_indexed, novel_unindexed
+from .counters import adjust_votes, refresh_chapter_stats, refresh_genre_labels
+from .facets import bump_facet_version, remove_novel_facets, sync_novel_facets
+from .feeds import invalidate_home_snapshot
+from .models import Chapter, FacetCount, Genre, Novel, NovelVote, Tag
+from .navigation import invalidate_chapter_index
+from .search import index_chapter_texts
+from .viewcounts import view_buffer
+
+# =====================================================
+# PERUBAHAN CHAPTER
+# =====================================================
+# Semua cache turunan daftar chapter sebuah novel di-invalidate lewat satu
+# pintu: chapters_changed(novel_id). save()/delete() per chapter memanggilnya
+# lewat signal; operasi massal (ingest) membisukan signal per baris lalu
+# memanggilnya sekali di akhir. Novel.updated_at ikut dinaikkan supaya jadi
+# versi (ETag / Last-Modified) untuk semua data turunan novel, bersama
+# counter chapter_count/latest_chapter_* dalam UPDATE yang sama.
+
+_state = threading.local()
+
+
+def touch_novels(**filters):
+    Novel.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def chapters_changed(novel_id):
+    refresh_chapter_stats(Novel.objects.filter(pk=novel_id), updated_at=timezone.now())
+    # Setelah commit: kalau di-invalidate sebelum commit, pembaca lain bisa
+    # membangun ulang cache dari data lama
+    transaction.on_commit(lambda: invalidate_chapter_index(novel_id))
+    transaction.on_commit(invalidate_home_snapshot)
+
+
+@contextmanager
+def mute_chapter_signals():
+    previous = getattr(_state, 'muted', False)
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_delete, sender=Chapter)
+def chapter_saved_or_deleted(sender, instance, **kwargs):
+    if getattr(_state, 'muted', False): return
+    chapters_changed(instance.novel_id)
+
+
+@receiver(post_save, sender=Chapter)
+def chapter_text_saved(sender, instance, update_fields=None, **kwargs):
+    # Ingest menulis ChapterText sendiri per batch (signal dibisukan)
+    if getattr(_state, 'muted', False): return
+    if update_fields is not None and 'content' not in update_fields: return
+    index_chapter_texts([(instance.pk, instance.novel_id, instance.content)])
+
+
+@receiver(post_save, sender=Novel)
+@receiver(post_delete, sender=Novel)
+def novel_saved_or_deleted(sender, instance, **kwargs):
+    # Kartu novel di home (judul, cover, status) ikut snapshot
+    transaction.on_commit(invalidate_home_snapshot)
+
+
+@receiver(post_save, sender=Novel)
+def novel_saved_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: novel_indexed(instance))
+
+
+@receiver(post_delete, sender=Novel)
+def novel_deleted_autocomplete(sender, instance, **kwargs):
+    novel_id = instance.pk
+    transaction.on_commit(lambda: novel_unindexed(novel_id))
+
+
+@receiver(m2m_changed, sender=Novel.tags.through)
+def novel_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.novel_set.clear(): pk_set kosong di post_clear, catat dulu novelnya
+        instance._cleared_novels = set(instance.novel_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'): return
+    if not reverse:
+        touch_novels(pk=instance.pk)
+        # Simpan juga di instance: save() berikutnya menulis ulang facet_state
+        instance.facet_state = sync_novel_facets(instance.pk)
+        return
+    novel_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_novels', set())
+    if novel_ids:
+        touch_novels(pk__in=novel_ids)
+        for novel_id in novel_ids:
+            sync_novel_facets(novel_id)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created: touch_novels(tags=instance)
+
+
+# =====================================================
+# GENRE
+# =====================================================
+# Relasi genre adalah sumber data; Novel.genre hanya label tampilan yang
+# ditulis ulang di sini setiap relasinya berubah.
+
+def genres_changed(novel_ids, facets=True):
+    """Tulis ulang label & facet novel-novel ini. Return {novel_id: (label, facet_state)}."""
+    if not novel_ids: return {}
+    labels = refresh_genre_labels(novel_ids)
+    touch_novels(pk__in=novel_ids)
+    transaction.on_commit(invalidate_home_snapshot)
+    return {
+        novel_id: (label, sync_novel_facets(novel_id) if facets else None)
+        for novel_id, label in labels.items()
+    }
+
+
+@receiver(m2m_changed, sender=Novel.genres.through)
+def novel_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_novels = set(instance.novels.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'): return
+    if not reverse:
+        instance.genre, instance.facet_state = genres_changed([instance.pk])[instance.pk]
+        return
+    genres_changed(pk_set if action != 'post_clear' else getattr(instance, '_cleared_novels', set()))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if created: return
+    # Ganti nama: label novel & nama di hasil facet (cache) ikut berubah
+    genres_changed(list(instance.novels.values_list('pk', flat=True)), facets=False)
+    transaction.on_commit(bump_facet_version)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance, **kwargs):
+    # Baris relasi ikut terhapus tanpa m2m_changed, catat dulu novelnya
+    instance._deleted_novels = list(instance.novels.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    genres_changed(getattr(instance, '_deleted_novels', []))
+    FacetCount.objects.filter(genre_id=instance.pk).delete()
+    transaction.on_commit(bump_facet_version)
+
+
+# =====================================================
+# FACET
+# =====================================================
+# Status dicek terhadap facet_state instance supaya save() yang tidak
+# mengubahnya (mis. ganti sinopsis) tidak menyentuh FacetCount. Genre & tag
+# disinkronkan dari signal m2m masing-masing.
+
+@receiver(post_save, sender=Novel)
+def novel_facets_saved(sender, instance, **kwargs):
+    state = instance.facet_state
+    if state and 'genres' in state and state['status'] == instance.status: return
+    instance.facet_state = sync_novel_facets(instance.pk)
+
+
+@receiver(pre_delete, sender=Novel)
+def novel_facets_deleting(sender, instance, **kwargs):
+    # facet_state di instance bisa basi (relasi m2m disinkronkan lewat UPDATE), ambil dari DB
+    instance.facet_state = Novel.objects.filter(pk=instance.pk).values_list('facet_state', flat=True).first()
+
+
+@receiver(post_delete, sender=Novel)
+def novel_facets_deleted(sender, instance, **kwargs):
+    remove_novel_facets(instance.facet_state)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    instance._deleted_novels = list(instance.novel_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    # Baris relasi ikut terhapus tanpa m2m_changed; facet_state novel diperbaiki saat sync berikutnya.
+    # updated_at dinaikkan supaya versi facet (dan ETag novel) di proses lain ikut berubah
+    touch_novels(pk__in=getattr(instance, '_deleted_novels', []))
+    FacetCount.objects.filter(tag_id=instance.pk).delete()
+    transaction.on_commit(bump_facet_version)
+
+
+# =====================================================
+# VOTE
+# =====================================================
+# Skor lama diambil sebelum save supaya update_or_create (ganti skor) cukup
+# menggeser vote_sum sebesar selisihnya.
+
+@receiver(pre_save, sender=NovelVote)
+def vote_saving(sender, instance, **kwargs):
+    instance._previous_score = None
+    if instance.pk:
+        instance._previous_score = NovelVote.objects.filter(pk=instance.pk).values_list('score', flat=True).first()
+
+
+@receiver(post_save, sender=NovelVote)
+def vote_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_score', None)
+    if created or previous is None:
+        adjust_votes(instance.novel_id, 1, int(instance.score))
+    elif int(instance.score) != previous:
+        adjust_votes(instance.novel_id, 0, int(instance.score) - previous)
+    else:
+        return
+    transaction.on_commit(invalidate_home_snapshot)
+
+
+@receiver(post_delete, sender=NovelVote)
+def vote_deleted(sender, instance, **kwargs):
+    adjust_votes(instance.novel_id, -1, -int(instance.score))
+    transaction.on_commit(invalidate_home_snapshot)
+
+
+# =====================================================
+# VIEW BUFFER
+# =====================================================
+# Interval flush juga dicek di akhir setiap request (bukan hanya saat ada view
+# berikutnya), supaya worker yang sepi view tidak menahan angka lama.
+
+@receiver(request_finished)
+def flush_due_views(sender, **kwargs):
+    view_buffer.flush_if_due()
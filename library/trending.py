@@ -0,0 +1,81 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import NovelViewBucket, TrendingRank
+
+# =====================================================
+# TRENDING (VIEW PER JAM + PELURUHAN EKSPONENSIAL)
+# =====================================================
+# Skor novel = jumlah view tiap jam * 0.5 ^ (umur jam / half-life), untuk
+# bucket dalam TRENDING_WINDOW_HOURS terakhir. Dihitung berkala oleh
+# `manage.py compute_trending` lalu disimpan berurutan di TrendingRank,
+# sehingga hot list cukup membaca rank 1..N lewat index.
+
+
+def half_life_hours():
+    return getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+
+
+def window_hours():
+    return getattr(settings, 'TRENDING_WINDOW_HOURS', 7 * 24)
+
+
+def ranking_size():
+    return getattr(settings, 'TRENDING_SIZE', 100)
+
+
+def current_hour(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_bucket_views(deltas, now=None):
+    """Tambahkan {novel_id: jumlah} ke bucket jam ini. Aman dipanggil paralel dari banyak worker."""
+    hour = current_hour(now)
+    # Baris nol dulu (abaikan yang sudah ada), lalu increment atomik: dua
+    # worker yang flush bersamaan tidak saling menimpa
+    NovelViewBucket.objects.bulk_create(
+        [NovelViewBucket(novel_id=pk, hour=hour) for pk in deltas], ignore_conflicts=True
+    )
+    increment = Case(
+        *(When(novel_id=pk, then=Value(count)) for pk, count in deltas.items()),
+        default=Value(0), output_field=IntegerField(),
+    )
+    NovelViewBucket.objects.filter(hour=hour, novel_id__in=list(deltas)).update(views=F('views') + increment)
+
+
+def trending_scores(now=None):
+    now = now or timezone.now()
+    since = current_hour(now) - timedelta(hours=window_hours())
+    decay = math.log(2) / half_life_hours()
+    scores = defaultdict(float)
+    rows = NovelViewBucket.objects.filter(hour__gte=since).values_list('novel_id', 'hour', 'views')
+    for novel_id, hour, views in rows.iterator():
+        age = max((now - hour).total_seconds() / 3600, 0)
+        scores[novel_id] += views * math.exp(-decay * age)
+    return scores
+
+
+def compute_trending(now=None):
+    """Hitung ulang TrendingRank dan hapus bucket di luar window. Return jumlah novel yang diranking."""
+    now = now or timezone.now()
+    scores = trending_scores(now)
+    top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:ranking_size()]
+    with transaction.atomic():
+        TrendingRank.objects.all().delete()
+        TrendingRank.objects.bulk_create(
+            TrendingRank(rank=i, novel_id=pk, score=score, computed_at=now)
+            for i, (pk, score) in enumerate(top, start=1)
+        )
+        NovelViewBucket.objects.filter(hour__lt=current_hour(now) - timedelta(hours=window_hours())).delete()
+    return len(top)
+
+
+def trending_novels(limit):
+    """Novel teratas dari TrendingRank (kosong kalau compute_trending belum pernah jalan)."""
+    return [r.novel for r in TrendingRank.objects.select_related('novel').order_by('rank')[:limit]]
@@ -1,188 +1,397 @@
 import os
 import re
 import json
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
-from .models import Chapter
+import hashlib
+import socket
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .counters import COUNTER_FIELDS
+from .models import Chapter, ContentDictionary, IngestJob, split_genres
+from .epub_reader import EpubReader
+from .search import index_chapter_texts
+from .signals import chapters_changed, mute_chapter_signals
+from .cleaning import CLEANERS, clean_document_task, iter_txt_paragraphs, iter_txt_chapters
 
 # =====================================================
 # METADATA HELPER
 # =====================================================
-def get_epub_metadata(epub_path):
-    metadata = {'title': None, 'author': "Unknown", 'synopsis': None, 'genre': "General"}
+def get_epub_metadata(epub):
+    """`epub` boleh path file atau EpubReader yang sudah terbuka."""
+    metadata = {'title': None, 'author': "Unknown", 'synopsis': None, 'genres': []}
     try:
-        book = epub.read_epub(epub_path)
-        if book.get_metadata('DC', 'title'): metadata['title'] = book.get_metadata('DC', 'title')[0][0]
-        if book.get_metadata('DC', 'creator'):
-            raw = book.get_metadata('DC', 'creator')[0][0]
-            if str(raw).strip() != "0": metadata['author'] = raw
-        if book.get_metadata('DC', 'description'):
-            metadata['synopsis'] = re.sub('<[^<]+?>', '', book.get_metadata('DC', 'description')[0][0])
-        subjects = book.get_metadata('DC', 'subject')
-        if subjects: metadata['genre'] = ", ".join(s[0] for s in subjects)[:100]
-        return metadata
+        if isinstance(epub, EpubReader):
+            return _read_metadata(epub, metadata)
+        with EpubReader(epub) as reader:
+            return _read_metadata(reader, metadata)
     except: return metadata
 
+def _read_metadata(reader, metadata):
+    if reader.get_metadata('title'): metadata['title'] = reader.get_metadata('title')[0]
+    if reader.get_metadata('creator'):
+        raw = reader.get_metadata('creator')[0]
+        if str(raw).strip() != "0": metadata['author'] = raw
+    if reader.get_metadata('description'):
+        metadata['synopsis'] = re.sub('<[^<]+?>', '', reader.get_metadata('description')[0])
+    subjects = reader.get_metadata('subject')
+    # Subject boleh berisi beberapa genre sekaligus ("Action, Fantasy")
+    if subjects: metadata['genres'] = split_genres(",".join(subjects))
+    return metadata
+
+# =====================================================
+# BATCH WRITER (SYNC DENGAN CHAPTER LAMA)
+# =====================================================
+def source_hash(data):
+    """Hash isi dokumen sumber (bytes dari EPUB / potongan TXT)."""
+    if isinstance(data, str): data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def chapter_index_for(title, order):
+    match = re.search(r'(?:chapter|bab|ep|part)\s*(\d+(\.\d+)?)', title, re.IGNORECASE)
+    chapter_index = float(match.group(1)) if match else order
+
+    if any(x in title.lower() for x in ["prologue", "intro", "pendahuluan"]):
+        chapter_index = 0
+    return chapter_index
+
+class ChapterBatchWriter:
+    """
+    Tulis hasil ingest ke tabel Chapter dengan diff terhadap chapter lama:
+    - dokumen dengan source_hash sama -> chapter lama dipakai lagi (ID tetap),
+      hanya judul/order/index yang diupdate kalau berubah;
+    - dokumen baru dengan judul sama dengan chapter lama -> konten diupdate;
+    - sisanya di-insert, dan chapter lama yang tidak terpakai dihapus di close().
+
+    Insert & update ditampung lalu disimpan per batch (bulk_create /
+    bulk_update), jadi memori tetap konstan. `progress(processed)` dipanggil
+    setiap `batch_size` chapter diproses.
+    """
+
+    META_FIELDS = ['title', 'order', 'chapter_index']
+    CONTENT_FIELDS = ['title', 'content', 'content_hash', 'content_length', 'order', 'chapter_index', 'source_hash']
+
+    def __init__(self, novel, batch_size=None, progress=None):
+        self.novel = novel
+        self.batch_size = batch_size or getattr(settings, 'CHAPTER_BATCH_SIZE', 500)
+        self.progress = progress
+        self.buffer = []
+        self.meta_updates = []
+        self.content_updates = []
+        self.processed = 0
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+
+        # Chapter lama (tanpa kolom content) untuk dicocokkan
+        self.existing = list(
+            Chapter.objects.filter(novel=novel).order_by('order', 'id')
+            .only('id', 'title', 'order', 'chapter_index', 'source_hash')
+        ) if novel.pk else []
+        self.by_hash = {}
+        self.by_title = {}
+        for chap in self.existing:
+            if chap.source_hash: self.by_hash.setdefault(chap.source_hash, []).append(chap)
+            self.by_title.setdefault(chap.title, []).append(chap)
+        self.claimed = set()
+        self.kept = set()
+        self.trained = False
+
+    @property
+    def written(self):
+        return self.stats['inserted']
+
+    def claim(self, source_hash):
+        """Ambil chapter lama dengan hash sama (atau None). Dipanggil sebelum cleaning."""
+        for chap in self.by_hash.get(source_hash, ()):
+            if chap.id not in self.claimed:
+                self.claimed.add(chap.id)
+                return chap
+        return None
+
+    def keep(self, chapter, order, chapter_index, title=None, content=None):
+        """Pakai lagi chapter hasil claim(); update seperlunya."""
+        self.kept.add(chapter.id)
+        if title is None: title = chapter.title
+        if content is not None:
+            chapter.title, chapter.content = title, content
+            chapter.order, chapter.chapter_index = order, chapter_index
+            self._queue(self.content_updates, chapter)
+        elif (chapter.title, chapter.order, chapter.chapter_index) != (title, order, chapter_index):
+            chapter.title, chapter.order, chapter.chapter_index = title, order, chapter_index
+            self._queue(self.meta_updates, chapter)
+        else:
+            self.stats['unchanged'] += 1
+            self._tick()
+
+    def add(self, title, content, order, chapter_index, source_hash=''):
+        # Konten berubah tapi judul sama -> update chapter lama (ID tetap)
+        for chap in self.by_title.get(title, ()):
+            if chap.id not in self.claimed:
+                self.claimed.add(chap.id)
+                chap.source_hash = source_hash
+                self.keep(chap, order, chapter_index, title=title, content=content)
+                return
+
+        self.buffer.append(Chapter(
+            novel=self.novel,
+            title=title,
+            content=content,
+            order=order,
+            chapter_index=chapter_index,
+            source_hash=source_hash
+        ))
+        self.stats['inserted'] += 1
+        self._tick()
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def _queue(self, bucket, chapter):
+        bucket.append(chapter)
+        self.stats['updated'] += 1
+        self._tick()
+        if len(bucket) >= self.batch_size:
+            self.flush()
+
+    def _tick(self):
+        self.processed += 1
+        if self.progress and self.processed % self.batch_size == 0:
+            self.progress(self.processed)
+
+    def flush(self):
+        # Novel tanpa dictionary zstd: latih dari batch pertama yang berisi
+        # konten baru (batch kosong / terlalu sedikit sampel dicoba lagi di flush berikutnya)
+        if self.novel.content_dictionary_id is None and not self.trained:
+            samples = [chap.content for chap in self.buffer + self.content_updates]
+            if samples and ContentDictionary.train_for(self.novel, samples) is not None:
+                self.trained = True
+
+        # Teks sumber untuk index isi chapter, diambil sebelum content dikompres
+        texts = [(chap, chap.content) for chap in self.buffer + self.content_updates]
+
+        if self.buffer:
+            Chapter.objects.bulk_create(self.buffer, batch_size=self.batch_size)
+            self.buffer = []
+        if self.meta_updates:
+            Chapter.objects.bulk_update(self.meta_updates, self.META_FIELDS, batch_size=self.batch_size)
+            self.meta_updates = []
+        if self.content_updates:
+            # bulk_update tidak memanggil pre_save: kompres (atau tulis ke blob
+            # store) di sini dengan dictionary novel
+            field = Chapter._meta.get_field('content')
+            for chap in self.content_updates:
+                chap.novel = self.novel
+                chap.content = field.bulk_value(chap)
+            Chapter.objects.bulk_update(self.content_updates, self.CONTENT_FIELDS, batch_size=self.batch_size)
+            self.content_updates = []
+        if texts:
+            index_chapter_texts([(chap.pk, self.novel.pk, html) for chap, html in texts], self.batch_size)
+
+    def close(self):
+        """Simpan sisa buffer lalu hapus chapter lama yang tidak ada lagi di sumber."""
+        self.flush()
+        stale = [chap.id for chap in self.existing if chap.id not in self.kept]
+        with mute_chapter_signals():
+            for i in range(0, len(stale), self.batch_size):
+                Chapter.objects.filter(pk__in=stale[i:i + self.batch_size]).delete()
+        self.stats['deleted'] = len(stale)
+        # File sama persis: cache, counter & ETag novel tetap berlaku
+        if self.stats['inserted'] or self.stats['updated'] or stale:
+            chapters_changed(self.novel.pk)
+        if self.progress: self.progress(self.processed)
+
+def bounded_map(pool, fn, iterable, window):
+    """Seperti pool.map tapi paling banyak `window` task menunggu (memori terbatas)."""
+    pending = deque()
+    for item in iterable:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
 # =====================================================
 # UTILS UTAMA
 # =====================================================
-def generate_chapters(novel_instance):
-    if not novel_instance.epub_file: return
+def generate_chapters(novel_instance, batch_size=None, progress=None, workers=None, cleaner=None, refresh=False, txt_mode=None, reader=None):
+    """
+    Ekstrak chapter dari EPUB/TXT milik novel dan sinkronkan dengan chapter
+    yang sudah ada (lihat ChapterBatchWriter): chapter yang tidak berubah
+    tetap dengan ID lama, jadi bookmark & komentar pembaca aman. Semua tulis
+    berjalan dalam satu transaksi, jadi kalau gagal di tengah jalan tidak ada
+    chapter setengah jadi. Return jumlah chapter novel setelah ingest.
+
+    `workers` > 1 membersihkan dokumen EPUB paralel di process pool
+    (default: settings.CHAPTER_INGEST_WORKERS); hasilnya identik dengan serial.
+    `cleaner` memilih engine cleaning: 'bs4' (default) atau 'lxml'.
+    `refresh=True` tetap men-clean ulang dokumen yang tidak berubah (mis.
+    setelah ganti cleaner); ID chapter tetap dipertahankan.
+    `txt_mode` untuk file TXT: 'chunk' (per 30 paragraf) atau 'heading'
+    (pecah di baris "Chapter N"/"Bab N"); default settings.TXT_CHAPTER_MODE.
+    `reader` = EpubReader yang sudah dibuka pemanggil (supaya EPUB cukup
+    dibuka sekali untuk metadata + chapter).
+    """
+    if not novel_instance.epub_file: return 0
+    if workers is None: workers = getattr(settings, 'CHAPTER_INGEST_WORKERS', 1)
+    if cleaner is None: cleaner = getattr(settings, 'CHAPTER_CLEANER', 'bs4')
+    if cleaner not in CLEANERS: raise ValueError(f"Cleaner tidak dikenal: {cleaner}")
     file_path = novel_instance.epub_file.path
 
     try:
-        # === PROSES EPUB ===
-        if file_path.endswith('.epub'):
-            book = epub.read_epub(file_path)
-
-            # Setup Judul Novel jika baru
-            if not novel_instance.title or novel_instance.title == "New Novel":
-                meta = get_epub_metadata(file_path)
-                if meta['title']:
-                    novel_instance.title = meta['title']
-                    novel_instance.alternative_title = meta['title']
-                    novel_instance.save()
-
-            order_count = 1
-
-            for item in book.get_items():
-                if item.get_type() != ebooklib.ITEM_DOCUMENT: continue
-
-                # 1. Parse HTML
-                soup = BeautifulSoup(item.get_content(), 'html.parser')
-                full_text_raw = soup.get_text(strip=True, separator='\n')
-                raw_filename = item.get_name().lower()
-
-                # -----------------------------------------------------------
-                # FILTER 1: JUDUL FILE (BLACKLIST)
-                # -----------------------------------------------------------
-                blacklist_filenames = [
-                    'table of contents', 'contents', 'index', 'copyright', 
-                    'intro', 'front page', 'title page', 'acknowledgments', 
-                    'nav', 'menu', 'cover', 'daftar isi', 'indeks', 
-                    'pendahuluan', 'halaman judul'
-                ]
-                
-                # Cek blacklist
-                if any(x in raw_filename for x in blacklist_filenames):
-                    # Pengecualian: Jika judul file mengandung kata 'chapter' atau 'bab', JANGAN skip
-                    if 'chapter' not in raw_filename and 'bab' not in raw_filename:
-                        print(f"[SKIP BLACKLIST] File: {item.get_name()}")
-                        continue
+        with ExitStack() as stack, transaction.atomic():
+            writer = ChapterBatchWriter(novel_instance, batch_size=batch_size, progress=progress)
 
-                # -----------------------------------------------------------
-                # FILTER 2: DETEKSI TOC (DILONGGARKAN)
-                # -----------------------------------------------------------
-                lines = [l.strip() for l in full_text_raw.split('\n') if l.strip()]
-                
-                # Regex mendeteksi baris yang terlihat seperti list chapter
-                regex_toc = re.compile(r'^(chapter|bab|vol|volume|part|episode|bagian)\s*\d+', re.IGNORECASE)
-                
-                chapter_line_count = 0
-                check_limit = min(len(lines), 100) 
-
-                for i in range(check_limit):
-                    if regex_toc.match(lines[i]):
-                        chapter_line_count += 1
-                
-                # REVISI: Batas dinaikkan jadi 50. 
-                # (Sebelumnya 10, yang membuat chapter dengan banyak "Part X" ikut terhapus)
-                if chapter_line_count > 50:
-                    print(f"[SKIP TOC CONTENT] File: {item.get_name()} (Found {chapter_line_count} chapter lines)")
-                    continue
-
-                # -----------------------------------------------------------
-                # CLEANING SERVICE
-                # -----------------------------------------------------------
-                for s in soup(['script', 'style', 'meta', 'link']): s.decompose()
-                
-                # Hapus elemen sampah crawler
-                for div in soup.find_all('div', id=['intro', 'footer', 'nav']): div.decompose()
-                for div in soup.find_all('div', class_=['footer', 'synopsis', 'nav']): div.decompose()
-                
-                # Hapus Navigasi Link (Prev/Next)
-                for a in soup.find_all('a'):
-                    txt = a.get_text().strip().lower()
-                    if txt in ['prev', 'next', 'previous', 'contents', 'daftar isi', 'index']:
-                        a.decompose()
-
-                # -----------------------------------------------------------
-                # HAPUS JUDUL GANDA (HEADER & PARAGRAF)
-                # -----------------------------------------------------------
-                final_title = ""
-
-                # A. Ambil & Hapus Header
-                header_tag = soup.find(['h1', 'h2', 'h3', 'title'])
-                if header_tag:
-                    final_title = header_tag.get_text(strip=True)
-                    header_tag.decompose()
-
-                # B. Ambil & Hapus Paragraf Judul (<p>Chapter X...)
-                regex_chapter_title = re.compile(r'^(chapter|bab|episode|part|bagian|vol|volume)\s*\d+', re.IGNORECASE)
-
-                for p in soup.find_all('p', limit=10):
-                    text = p.get_text(strip=True)
-                    if not text: continue
-
-                    if regex_chapter_title.match(text):
-                        if not final_title:
-                            final_title = text
-                        p.decompose() # Hapus dari body agar tidak dobel
-
-                # Fallback Title
-                if not final_title:
-                    final_title = item.get_name()
-
-                # Filter Akhir: Judul Blacklist
-                if any(x in final_title.lower() for x in blacklist_filenames):
-                     # Pengecualian lagi untuk 'Chapter'
-                    if 'chapter' not in final_title.lower():
-                        continue
-                
-                if final_title.strip().lower() == novel_instance.title.strip().lower():
-                    continue
-
-                # -----------------------------------------------------------
-                # SIMPAN
-                # -----------------------------------------------------------
-                body = soup.find('body')
-                content_html = body.decode_contents() if body else str(soup)
-                content_html = content_html.strip()
-
-                # Cek Konten Kosong (Batas diturunkan jadi 20 char)
-                if len(BeautifulSoup(content_html, "html.parser").get_text(strip=True)) < 20:
-                    print(f"[SKIP EMPTY] File: {item.get_name()} (Content too short)")
-                    continue
-
-                # Indexing
-                match = re.search(r'(?:chapter|bab|ep|part)\s*(\d+(\.\d+)?)', final_title, re.IGNORECASE)
-                chapter_index = float(match.group(1)) if match else order_count
-                
-                if any(x in final_title.lower() for x in ["prologue", "intro", "pendahuluan"]): 
-                    chapter_index = 0
-
-                Chapter.objects.create(
-                    novel=novel_instance,
-                    title=final_title,
-                    content=content_html,
-                    order=order_count,
-                    chapter_index=chapter_index
+            # === PROSES EPUB ===
+            if file_path.endswith('.epub'):
+                reader = stack.enter_context(EpubReader(file_path)) if reader is None else reader
+
+                # Setup Judul Novel jika baru
+                if not novel_instance.title or novel_instance.title == "New Novel":
+                    meta = get_epub_metadata(reader)
+                    if meta['title']:
+                        novel_instance.title = meta['title']
+                        novel_instance.alternative_title = meta['title']
+                        novel_instance.save(update_fields=['title', 'alternative_title'])
+
+                docs = reader.documents()
+
+                # Dokumen yang hash-nya sama dengan chapter lama tidak perlu
+                # di-clean ulang (kecuali refresh=True)
+                hashes = [doc.hash() for doc in docs]
+                reused = [writer.claim(h) for h in hashes]
+                tasks = (
+                    (i, doc.name, doc.read(), novel_instance.title, cleaner)
+                    for i, doc in enumerate(docs) if refresh or reused[i] is None
                 )
-                order_count += 1
+                order_count = 1
+
+                # Cleaning HTML (CPU-bound) bisa dipecah ke process pool.
+                # Hasil tetap keluar sesuai urutan dokumen (spine).
+                if workers > 1 and len(docs) > 1:
+                    pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                    cleaned = bounded_map(pool, clean_document_task, tasks, window=workers * 4)
+                else:
+                    cleaned = map(clean_document_task, tasks)
 
-        # === PROSES TXT ===
-        elif file_path.endswith('.txt'):
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            parts = [p for p in content.split('\n\n') if p.strip()]
-            chunk_size = 30
-            for i in range(0, len(parts), chunk_size):
-                body = "".join(f"<p>{line.strip()}</p>" for line in parts[i:i+chunk_size])
-                chap = (i // chunk_size) + 1
-                Chapter.objects.create(novel=novel_instance, title=f"Part {chap}", content=body, order=chap, chapter_index=chap)
+                for i, h in enumerate(hashes):
+                    chapter = reused[i]
+                    if chapter is not None and not refresh:
+                        writer.keep(chapter, order_count, chapter_index_for(chapter.title, order_count))
+                        order_count += 1
+                        continue
+
+                    result = next(cleaned)
+                    if result is None: continue
+                    final_title, content_html, _ = result
+                    chapter_index = chapter_index_for(final_title, order_count)
+
+                    if chapter is not None:
+                        writer.keep(chapter, order_count, chapter_index, title=final_title, content=content_html)
+                    else:
+                        writer.add(
+                            title=final_title,
+                            content=content_html,
+                            order=order_count,
+                            chapter_index=chapter_index,
+                            source_hash=h
+                        )
+                    order_count += 1
 
-        novel_instance.save()
+            # === PROSES TXT (STREAMING) ===
+            elif file_path.endswith('.txt'):
+                paragraphs = iter_txt_paragraphs(file_path)
+                chapters = iter_txt_chapters(
+                    paragraphs,
+                    chunk_size=getattr(settings, 'TXT_CHUNK_SIZE', 30),
+                    mode=txt_mode or getattr(settings, 'TXT_CHAPTER_MODE', 'chunk')
+                )
+                for chap, (title, lines) in enumerate(chapters, 1):
+                    body = "".join(f"<p>{line.strip()}</p>" for line in lines)
+                    if title is None:
+                        title, chapter_index = f"Part {chap}", chap
+                    else:
+                        chapter_index = chapter_index_for(title, chap)
+                    h = source_hash(body)
+                    chapter = writer.claim(h)
+                    if chapter is not None:
+                        writer.keep(chapter, chap, chapter_index, title=title)
+                    else:
+                        writer.add(title=title, content=body, order=chap, chapter_index=chapter_index, source_hash=h)
+
+            writer.close()
+            print(f"[INGEST] {novel_instance.title}: {writer.stats}")
+            # Counter sudah ditulis chapters_changed(); jangan save() instance
+            # (nilai lama di memori menimpa counter, vote & views), cukup baca ulang
+            novel_instance.refresh_from_db(fields=[*COUNTER_FIELDS, 'updated_at'])
 
     except Exception as e:
-        print(f"Error processing: {e}")
\ No newline at end of file
+        print(f"Error processing: {e}")
+        raise
+
+    return writer.processed
+
+# =====================================================
+# INGEST (DIPAKAI WORKER)
+# =====================================================
+def ingest_novel(novel, progress=None, **options):
+    """
+    Isi metadata kosong dari EPUB, lalu sinkronkan chapter dengan file
+    terbaru (hanya yang berubah yang ditulis). `options` diteruskan ke
+    generate_chapters.
+    """
+    if not novel.epub_file.name.endswith('.epub'):
+        return generate_chapters(novel, progress=progress, **options)
+
+    with EpubReader(novel.epub_file.path) as reader:
+        meta = get_epub_metadata(reader)
+        updated = []
+        if not novel.title or novel.title in ["New Novel", "."]:
+            if meta.get('title'): novel.title = meta['title']; updated += ['title', 'alternative_title']
+        if not novel.author or novel.author == "Unknown":
+            if meta.get('author'): novel.author = meta['author']; updated.append('author')
+        if not novel.synopsis:
+            if meta.get('synopsis'): novel.synopsis = meta['synopsis']; updated.append('synopsis')
+
+        # Hanya kolom metadata: counter/views/vote dirawat di tempat lain
+        if updated: novel.save(update_fields=updated)
+        if meta['genres'] and not novel.genres.exists(): novel.set_genres(meta['genres'])
+
+        return generate_chapters(novel, progress=progress, reader=reader, **options)
+
+def enqueue_ingest(novel):
+    """Buat job pending untuk novel (satu job pending per novel cukup)."""
+    job = novel.ingest_jobs.filter(status='pending').first()
+    return job or IngestJob.objects.create(novel=novel)
+
+def claim_next_job(worker_name=None):
+    """
+    Ambil job pending tertua. Klaim memakai UPDATE bersyarat status, jadi
+    aman dijalankan beberapa worker sekaligus (SQLite maupun PostgreSQL).
+    """
+    worker_name = worker_name or f"{socket.gethostname()}:{os.getpid()}"
+    candidates = IngestJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        claimed = IngestJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=timezone.now(), worker=worker_name
+        )
+        if claimed:
+            return IngestJob.objects.select_related('novel').get(pk=job_id)
+    return None
+
+def run_ingest_job(job):
+    def report(written):
+        cache.set(job.progress_key, written, 60 * 60)
+
+    try:
+        job.chapters_created = ingest_novel(job.novel, progress=report)
+        job.status = 'done'
+        job.error = ''
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'chapters_created', 'error', 'finished_at'])
+    cache.delete(job.progress_key)
+    return job
@@ -0,0 +1,115 @@
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Novel
+from .trending import record_bucket_views
+
+# =====================================================
+# BUFFER VIEW NOVEL (WRITE-BEHIND)
+# =====================================================
+# Setiap view hanya menambah angka di memori proses. Tiap
+# VIEW_COUNT_FLUSH_INTERVAL detik (dicek saat ada view berikutnya dan di akhir
+# setiap request lewat signal request_finished, jadi proses yang sepi view
+# tetap flush) atau saat buffer berisi VIEW_COUNT_FLUSH_SIZE novel, total per
+# novel ditulis dengan
+# satu UPDATE ... SET views = views + CASE id WHEN ... END (plus bucket per jam
+# untuk trending). Karena yang ditulis selisih (bukan nilai absolut), tiap
+# worker gunicorn boleh flush sendiri-sendiri tanpa koordinasi. View yang
+# belum di-flush saat proses mati (bukan exit normal) hilang: `views` sengaja
+# hanya eventually consistent.
+
+# Batas parameter SQLite (999) dengan 3 parameter per novel
+FLUSH_CHUNK = 300
+
+
+def flush_interval():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+
+def flush_size():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_SIZE', 1000)
+
+
+def write_view_deltas(deltas):
+    """
+    Tambahkan {novel_id: jumlah} ke Novel.views (satu UPDATE per chunk) dan ke
+    bucket trending. View untuk novel yang sudah dihapus dibuang. Return
+    jumlah novel yang ditulis.
+    """
+    items, written = list(deltas.items()), 0
+    with transaction.atomic():
+        for i in range(0, len(items), FLUSH_CHUNK):
+            # Insert bucket untuk novel yang sudah dihapus gagal di FK dan
+            # menggagalkan seluruh flush; baris novel dikunci sampai commit
+            # supaya tidak terhapus di tengah jalan (PostgreSQL)
+            chunk = items[i:i + FLUSH_CHUNK]
+            live = set(
+                Novel.objects.select_for_update().filter(pk__in=[pk for pk, _ in chunk]).values_list('pk', flat=True)
+            )
+            chunk = [(pk, count) for pk, count in chunk if pk in live]
+            if not chunk: continue
+            written += len(chunk)
+            increment = Case(
+                *(When(pk=pk, then=Value(count)) for pk, count in chunk),
+                default=Value(0), output_field=IntegerField(),
+            )
+            Novel.objects.filter(pk__in=[pk for pk, _ in chunk]).update(views=F('views') + increment)
+            record_bucket_views(dict(chunk))
+    return written
+
+
+class ViewBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.last_flush = time.monotonic()
+
+    def record(self, novel_id, count=1):
+        with self.lock:
+            self.pending[novel_id] += count
+            due = self._due()
+        if due: self.flush()
+
+    def flush_if_due(self):
+        with self.lock:
+            due = bool(self.pending) and self._due()
+        return self.flush() if due else 0
+
+    def _due(self):
+        return time.monotonic() - self.last_flush >= flush_interval() or len(self.pending) >= flush_size()
+
+    def take(self):
+        with self.lock:
+            deltas, self.pending = self.pending, Counter()
+            self.last_flush = time.monotonic()
+        return deltas
+
+    def flush(self):
+        """Tulis semua view tertunda. Return jumlah novel yang di-update."""
+        deltas = self.take()
+        if not deltas: return 0
+        try:
+            return write_view_deltas(deltas)
+        except DatabaseError as e:
+            # Misal database terkunci (SQLite): kembalikan ke buffer, coba lagi di flush berikutnya
+            with self.lock:
+                self.pending.update(deltas)
+            print(f"[VIEWS ERROR] flush {len(deltas)} novel gagal: {e}")
+            return 0
+
+    def clear(self):
+        self.take()
+
+
+view_buffer = ViewBuffer()
+atexit.register(view_buffer.flush)
+
+
+def record_view(novel_id):
+    view_buffer.record(novel_id)
@@ -124,6 +124,18 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# --- CACHE ---
+# Default LocMem (per proses). Kalau web & ingest_worker jalan di proses
+# berbeda, arahkan ke cache bersama (file/redis) lewat env agar progress
+# job dan cache lain terlihat oleh semua proses.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='zennovel'),
+    }
+}
+
 # Di settings.py
 CORS_ALLOW_ALL_ORIGINS = False # Matikan all origins
 CORS_ALLOWED_ORIGINS = [
@@ -149,4 +161,51 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': False,
-}
\ No newline at end of file
+}
+
+# --- INGEST EPUB/TXT ---
+# Jumlah chapter per bulk_create saat generate_chapters
+CHAPTER_BATCH_SIZE = config('CHAPTER_BATCH_SIZE', default=500, cast=int)
+# Jumlah proses untuk cleaning HTML EPUB (1 = serial)
+CHAPTER_INGEST_WORKERS = config('CHAPTER_INGEST_WORKERS', default=1, cast=int)
+# Engine cleaning HTML chapter: 'bs4' (lama) atau 'lxml' (satu kali parse, lebih cepat)
+CHAPTER_CLEANER = config('CHAPTER_CLEANER', default='bs4')
+# Pemecahan chapter file TXT: 'chunk' (tiap TXT_CHUNK_SIZE paragraf) atau 'heading'
+TXT_CHAPTER_MODE = config('TXT_CHAPTER_MODE', default='chunk')
+TXT_CHUNK_SIZE = config('TXT_CHUNK_SIZE', default=30, cast=int)
+# Kompresi konten chapter (zstd + dictionary per novel, lihat library/compression.py)
+CHAPTER_ZSTD_LEVEL = config('CHAPTER_ZSTD_LEVEL', default=6, cast=int)
+CHAPTER_ZSTD_DICT_SIZE = config('CHAPTER_ZSTD_DICT_SIZE', default=64 * 1024, cast=int)
+# Minimal jumlah chapter untuk melatih dictionary; di bawah ini dikompres tanpa dictionary
+CHAPTER_ZSTD_MIN_SAMPLES = config('CHAPTER_ZSTD_MIN_SAMPLES', default=8, cast=int)
+# Penyimpanan isi chapter: 'db' (kolom terkompresi) atau 'blob' (file content-addressed
+# di MEDIA_ROOT/CHAPTER_BLOB_DIR). Pindahkan data lama dengan `manage.py move_chapter_content`.
+CHAPTER_CONTENT_STORAGE = config('CHAPTER_CONTENT_STORAGE', default='db')
+CHAPTER_BLOB_DIR = config('CHAPTER_BLOB_DIR', default='chapter_blobs')
+# Endpoint bundle chapter (/api/chapters/<pk>/bundle/?ahead=K): default & batas K
+CHAPTER_BUNDLE_DEFAULT = config('CHAPTER_BUNDLE_DEFAULT', default=3, cast=int)
+CHAPTER_BUNDLE_MAX = config('CHAPTER_BUNDLE_MAX', default=10, cast=int)
+# Snapshot home feed bersama (hot/latest/completed) di cache, dalam detik.
+# Segarkan terjadwal dengan `manage.py refresh_home_feed`.
+HOME_SNAPSHOT_TIMEOUT = config('HOME_SNAPSHOT_TIMEOUT', default=300, cast=int)
+# Counter views novel di-buffer per proses lalu ditulis massal (library/viewcounts.py):
+# paling lama tiap N detik atau saat buffer berisi sekian novel. 0 = tulis langsung.
+VIEW_COUNT_FLUSH_INTERVAL = config('VIEW_COUNT_FLUSH_INTERVAL', default=10, cast=int)
+VIEW_COUNT_FLUSH_SIZE = config('VIEW_COUNT_FLUSH_SIZE', default=1000, cast=int)
+# Trending (library/trending.py): half-life peluruhan skor, rentang bucket view
+# per jam yang dihitung, dan jumlah novel yang disimpan di TrendingRank.
+# Hitung ulang berkala dengan `manage.py compute_trending`.
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=24, cast=float)
+TRENDING_WINDOW_HOURS = config('TRENDING_WINDOW_HOURS', default=7 * 24, cast=int)
+TRENDING_SIZE = config('TRENDING_SIZE', default=100, cast=int)
+# Autocomplete judul (/api/novels/autocomplete/): porsi minimal trigram query yang
+# harus cocok (0-1). Makin kecil makin toleran typo, makin banyak saran ngawur.
+AUTOCOMPLETE_MIN_SCORE = config('AUTOCOMPLETE_MIN_SCORE', default=0.45, cast=float)
+# Tiap berapa detik index autocomplete tiap proses dicek terhadap DB untuk
+# perubahan novel dari proses lain (ingest_worker, admin, worker web lain).
+AUTOCOMPLETE_REFRESH_INTERVAL = config('AUTOCOMPLETE_REFRESH_INTERVAL', default=30, cast=int)
+# Sama untuk versi cache facet (/api/facets/, /api/genres/).
+FACET_REFRESH_INTERVAL = config('FACET_REFRESH_INTERVAL', default=30, cast=int)
+# Simpan teks polos chapter (ChapterText) saat ingest untuk pencarian isi per novel
+# (/api/novels/<id>/search/). Chapter lama: `manage.py index_chapter_text`.
+CHAPTER_TEXT_INDEX = config('CHAPTER_TEXT_INDEX', default=True, cast=bool)
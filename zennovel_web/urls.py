@@ -11,8 +11,13 @@ urlpatterns = [
     # --- API ENDPOINTS ---
     path('api/home/', json_views.home_data, name='api_home_data'),
     path('api/novels/', json_views.novel_list, name='api_novel_list'),
+    path('api/search/', json_views.search_novels, name='api_search_novels'),
+    path('api/novels/autocomplete/', json_views.novel_autocomplete, name='api_novel_autocomplete'),
     path('api/novels/<int:pk>/', json_views.novel_detail, name='api_novel_detail'),
+    path('api/novels/<int:novel_id>/chapters/', json_views.novel_chapters, name='api_novel_chapters'),
+    path('api/novels/<int:novel_id>/search/', json_views.novel_text_search, name='api_novel_text_search'),
     path('api/chapters/<int:pk>/', json_views.chapter_detail, name='api_chapter_detail'),
+    path('api/chapters/<int:pk>/bundle/', json_views.chapter_bundle, name='api_chapter_bundle'),
 
     # --- AUTH & USER ---
     path('api/register/', json_views.register_api, name='api_register'),
@@ -42,5 +47,10 @@ urlpatterns = [
     path('api/novels/<int:pk>/rate/', json_views.rate_novel, name='api_rate_novel'),
     path('api/tag/<slug:tag_slug>/', json_views.novels_by_tag, name='api_novels_by_tag'),
     path('api/genres/', json_views.genre_list_api, name='genre-list-api'),
+    path('api/facets/', json_views.facet_browse, name='api_facets'),
+
+    # --- ANTRIAN INGEST (ADMIN) ---
+    path('api/ingest/<int:pk>/', json_views.ingest_job_detail, name='api_ingest_job_detail'),
+    path('api/novels/<int:novel_id>/ingest/', json_views.novel_ingest_status, name='api_novel_ingest_status'),
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file